@@ -7,6 +7,9 @@ server_port = 5000
 
 token = ""
 
+# (url, params) -> (etag, body) of earlier GETs, sent back as If-None-Match
+etag_cache = {}
+
 ITEM_PARAMS = {
     "Orders": ["user_id", "currency", "shipping_address", "billing_address", "order_items"],
     "Products": ["product_name", "unit_price", "tax_rate"],
@@ -21,31 +24,35 @@ data = {
     "Inventory": []
 }
 
+def get_cached(url: str, params: dict):
+    key = (url, tuple(sorted(params.items())))
+    cached = etag_cache.get(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    r = requests.get(url, params=params, headers=headers)
+    if r.status_code == 304 and cached:
+        return cached[1]
+    r.raise_for_status()
+    body = r.json()
+    if "ETag" in r.headers:
+        etag_cache[key] = (r.headers["ETag"], body)
+    return body
+
+def get_all(path: str, page_size: int = 1000) -> list:
+    url = f"http://{server_ip}:{server_port}{path}"
+    items = []
+    cursor = 0
+    while cursor is not None:
+        page = get_cached(url, {"token": token, "after_id": cursor, "limit": page_size})
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+    return items
+
 def update_data():
     global data
-    url = f"http://{server_ip}:{server_port}/orders/all"
-    
-    r = requests.get(url, params={"token": token})
-    r.raise_for_status()
-    data["Orders"] = list(r.json())
-    
-    url = f"http://{server_ip}:{server_port}/products/all"
-    
-    r = requests.get(url, params={"token": token})
-    r.raise_for_status()
-    data["Products"] = list(r.json())
-    
-    url = f"http://{server_ip}:{server_port}/warehouses/all"
-    
-    r = requests.get(url, params={"token": token})
-    r.raise_for_status()
-    data["Warehouses"] = list(r.json())
-    
-    url = f"http://{server_ip}:{server_port}/inventory"
-    
-    r = requests.get(url, params={"token": token})
-    r.raise_for_status()
-    data["Inventory"] = list(r.json())
+    data["Orders"] = get_all("/orders/all")
+    data["Products"] = get_all("/products/all")
+    data["Warehouses"] = get_all("/warehouses/all")
+    data["Inventory"] = get_all("/inventory/all")
 
 def populate_tree(tree: ttk.Treeview, parent: str, data: dict):
     tree.detach()
@@ -194,9 +201,7 @@ def create_main_panel() -> tk.PanedWindow:
                     product_names[p["product_name"]] = p["id"]
                 
                 if not is_new:
-                    url = f"http://{server_ip}:{server_port}/orders/{item_id}/items"
-                    r = requests.get(url, params={"token": token})
-                    for i in r.json():
+                    for i in get_all(f"/orders/{item_id}/items"):
                         item_row = tk.Frame(row)
                         combobox = ttk.Combobox(item_row)
                         combobox['values'] = tuple(product_names.keys())
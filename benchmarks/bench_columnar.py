@@ -0,0 +1,90 @@
+"""
+Compares payload size and serialization time of the default JSON response
+(one object per row, as built by rows_to_dicts and jsonify) with the columnar
+format (?format=columnar).
+
+Runs in-process on generated rows shaped like v_sales_summary, so no server
+or database is needed:
+
+    python benchmarks/bench_columnar.py --rows 100000
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from flask import Flask  # noqa: E402
+
+from columnar import dumps_columnar  # noqa: E402
+from table_gateway import rows_to_columnar, rows_to_dicts  # noqa: E402
+
+COLUMNS = [
+    "order_id", "user_id", "order_status", "payment_status", "total_amount", "currency",
+    "warehouse_name", "created_at", "total_items", "total_amount_calculated",
+]
+
+
+class FakeCursor:
+    # only what the row shaping helpers read
+    description = [(name,) for name in COLUMNS]
+
+
+def make_rows(count: int) -> list:
+    started = datetime(2025, 1, 1)
+    statuses = ["CREATED", "PAID", "SHIPPED", "CANCELLED"]
+    return [
+        (
+            i, 1 + i % 500, statuses[i % 4], "CONFIRMED" if i % 3 else "INITIATED",
+            Decimal(f"{100 + i % 9000}.{i % 100:02d}"), "CZK", f"Warehouse {i % 7}",
+            started + timedelta(minutes=i), 1 + i % 12, Decimal(f"{121 + i % 9000}.{i % 100:02d}"),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def best_of(repeat: int, fn):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per path, the fastest is reported")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    cursor = FakeCursor()
+    rows = make_rows(args.rows)
+
+    paths = [
+        ("dicts + jsonify", lambda: app.json.dumps(rows_to_dicts(cursor, rows))),
+        ("columnar", lambda: dumps_columnar(rows_to_columnar(cursor, rows))),
+    ]
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    print(f"{'format':<18}{'seconds':>10}{'rows/s':>12}{'bytes':>14}{'gzip bytes':>14}")
+    results = []
+    for name, fn in paths:
+        seconds, body = best_of(args.repeat, fn)
+        data = body.encode()
+        compressed = len(gzip.compress(data, 6))
+        results.append((seconds, len(data)))
+        print(f"{name:<18}{seconds:>10.3f}{args.rows / seconds:>12.0f}{len(data):>14}{compressed:>14}")
+
+    (dict_time, dict_size), (col_time, col_size) = results
+    print(f"columnar: {dict_time / col_time:.1f}x faster, {col_size / dict_size:.0%} of the payload")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Memory per row of the emulator's large tables: plain dicts (as the rows
+used to be stored) against the compact Row types of memory_server.py.
+
+    python benchmarks/bench_emulator_memory.py --rows 200000
+
+Rows are built from parsed JSON, like rows created through the API, so
+every value starts out as its own object.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "server_emulator_no_db"))
+
+import memory_server  # noqa: E402
+
+
+def order(i: int) -> dict:
+    return {
+        "id": i,
+        "id_user": i % 5000,
+        "status": "CREATED",
+        "total_amount": 1234.5 + i,
+        "unit_price": 0,
+        "tax_rate": 0,
+        "currency": "CZK",
+        "payment_status": "INITIATED",
+        "warehouse_id": 1 + i % 3,
+        "shipping_address": f"Armenska {i % 5000}, Kladno 27201",
+        "billing_address": f"Armenska {i % 5000}, Kladno 27201",
+        "created_at": "2025-12-23T00:00:00",
+        "updated_at": "2025-12-23T00:00:00",
+    }
+
+
+def order_item(i: int) -> dict:
+    return {"id": i, "order_id": i // 3, "product_id": 1 + i % 50, "quantity": 1 + i % 4,
+            "unit_price": 1700.0 + i % 50, "tax_rate": 0.21}
+
+
+def inventory(i: int) -> dict:
+    return {"id": i, "warehouse_id": 1 + i % 3, "product_id": i, "quantity_available": 30 + i % 100,
+            "quantity_reserved": i % 5}
+
+
+TABLES = {"orders": order, "order_items": order_item, "inventory": inventory}
+
+
+def measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    table = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del table
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows per table, bytes per row (including the table dict)")
+    print(f"{'table':<12}{'dict':>8}{'Row':>8}{'saved':>8}")
+    for name, make in TABLES.items():
+        # one JSON document per table, parsed the way request bodies are
+        body = json.dumps([make(i) for i in range(1, args.rows + 1)])
+        row_type = memory_server.ROW_TYPES[name]
+        before = measure(lambda: {r["id"]: r for r in json.loads(body)})
+        after = measure(lambda: {r["id"]: row_type(r) for r in json.loads(body)})
+        print(f"{name:<12}{before / args.rows:>8.0f}{after / args.rows:>8.0f}{1 - after / before:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Microbenchmarks of the Python side of src/table_gateway.py: row conversion,
+SQL building and JSON serialization, with an in-process fake cursor in
+place of pyodbc, so the numbers contain no database time at all.
+
+    python benchmarks/bench_gateways.py --rows 1000 --width 10
+    python benchmarks/bench_gateways.py --only rows_to_dicts updateById --output gateways.json
+
+The fake cursor returns --rows synthetic rows of --width columns (ints,
+strings, Decimals and datetimes, first column "id") for every query.
+Each case is timed with timeit's autorange and the best of --repeat runs
+is reported per call and per row.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from flask import Flask, jsonify  # noqa: E402
+
+from columnar import dumps_columnar  # noqa: E402
+from table_gateway import (  # noqa: E402
+    InventoryGateway, OrdersGateway, ProductsGateway, SalesReportGateway, StockReportGateway,
+    WarehouseGateway, row_to_dict, rows_to_columnar, rows_to_dicts,
+)
+
+
+class FakeCursor:
+    """Answers every query with the same synthetic result; remembers the last statement."""
+
+    def __init__(self, width: int, count: int):
+        self.description = [("id", int, None, 10, 10, 0, False)] + [
+            (f"col_{i}", str, None, 100, 100, 0, True) for i in range(1, width)
+        ]
+        started = datetime(2025, 1, 1)
+        kinds = [
+            lambda n: n % 1000,
+            lambda n: f"value {n % 997}",
+            lambda n: Decimal(f"{n % 9000}.{n % 100:02d}"),
+            lambda n: started + timedelta(minutes=n),
+        ]
+        self.rows = [tuple([n] + [kinds[c % 4](n) for c in range(1, width)]) for n in range(1, count + 1)]
+        self.messages = []
+        self.rowcount = count
+        self.sql = None
+        self.params = None
+        self._position = 0
+
+    def execute(self, sql, *params):
+        self.sql = sql
+        self.params = params
+        self._position = 0
+        return self
+
+    def fetchone(self):
+        if self._position >= len(self.rows):
+            return None
+        self._position += 1
+        return self.rows[self._position - 1]
+
+    def fetchmany(self, size: int = 1):
+        rows = self.rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.rows[self._position:]
+        self._position = len(self.rows)
+        return rows
+
+
+UPDATE = {
+    "orders": (OrdersGateway, {"status_id": 3, "payment_status": 2, "shipping_address": "Armenska 2673, Kladno 27201"}),
+    "warehouse": (WarehouseGateway, {"warehouse_name": "Main", "location_code": "PRG1", "is_active": True}),
+    "products": (ProductsGateway, {"product_name": "ThinkPad X270", "unit_price": 1700, "tax_rate": 0.21}),
+    "inventory": (InventoryGateway, {"quantity_available": 30, "quantity_reserved": 5}),
+}
+
+
+def cases(cursor: FakeCursor, app: Flask) -> dict:
+    """name -> (function, rows it handles per call)"""
+    rows = cursor.rows
+    dicts = rows_to_dicts(cursor, rows)
+    table = rows_to_columnar(cursor, rows)
+    count = len(rows)
+    limit = min(count - 1, 100) if count > 1 else 1
+
+    def in_app(fn):
+        def run():
+            with app.app_context():
+                return fn()
+        return run
+
+    found = {
+        # conversion of fetched rows
+        "row_to_dict": (lambda: row_to_dict(cursor, rows[0]), 1),
+        "rows_to_dicts": (lambda: rows_to_dicts(cursor, rows), count),
+        "rows_to_columnar": (lambda: rows_to_columnar(cursor, rows), count),
+        # serialization of converted rows
+        "jsonify(dicts)": (in_app(lambda: jsonify(dicts).get_data()), count),
+        "dumps_columnar": (lambda: dumps_columnar(table), count),
+        # SQL building
+        "SalesReport.buildQuery": (lambda: SalesReportGateway.buildQuery(
+            {"date_from": datetime(2025, 1, 1), "warehouse_id": 1}, ["month", "warehouse"]), 0),
+        # whole gateway calls against the fake cursor
+        "Orders.selectById": (lambda: OrdersGateway(cursor).selectById(1), 1),
+        "Orders.selectPage": (lambda: OrdersGateway(cursor).selectPage(0, limit), limit),
+        "Orders.selectAll": (lambda: OrdersGateway(cursor).selectAll(), count),
+        "Inventory.selectByProductPage": (lambda: InventoryGateway(cursor).selectByProductPage(1, 0, limit), limit),
+        "SalesReport.selectAll": (lambda: SalesReportGateway(cursor).selectAll(), count),
+        "SalesReport.selectAll(columnar)": (lambda: SalesReportGateway(cursor).selectAll(columnar=True), count),
+        "StockReport.selectAll": (lambda: StockReportGateway(cursor).selectAll(), count),
+    }
+    for name, (gateway, data) in UPDATE.items():
+        found[f"{gateway.__name__}.updateById"] = (lambda g=gateway, d=data: g(cursor).updateById(1, d), 0)
+    return found
+
+
+def measure(fn, repeat: int) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="rows the fake cursor returns")
+    parser.add_argument("--width", type=int, default=10, help="columns per row")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", help="run the cases whose name contains one of these")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    cursor = FakeCursor(args.width, args.rows)
+    app = Flask(__name__)
+    selected = {
+        name: case for name, case in cases(cursor, app).items()
+        if not args.only or any(part in name for part in args.only)
+    }
+
+    print(f"fake cursor: {args.rows} rows x {args.width} columns, best of {args.repeat}")
+    print(f"{'case':<36}{'us/call':>12}{'us/row':>10}")
+    results = {}
+    for name, (fn, rows) in selected.items():
+        seconds = measure(fn, args.repeat)
+        per_row = seconds / rows if rows else None
+        results[name] = {"us_per_call": round(seconds * 1e6, 3), "us_per_row": round(per_row * 1e6, 4) if per_row else None,
+                         "rows": rows}
+        print(f"{name:<36}{seconds * 1e6:>12.2f}" + (f"{per_row * 1e6:>10.3f}" if per_row else f"{'-':>10}"))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "width": args.width, "cases": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
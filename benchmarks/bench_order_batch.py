@@ -0,0 +1,66 @@
+"""
+Compares order creation throughput of POST /orders (one order per request)
+against POST /orders/batch.
+
+Run against a started API server, e.g.
+
+    python src/server.py
+    python benchmarks/bench_order_batch.py --url http://localhost:5000 --orders 2000
+
+or against the emulator (server_emulator_no_db/memory_server.py) to measure
+the HTTP overhead alone.
+"""
+import argparse
+import time
+
+import requests
+
+
+def make_order(i: int) -> dict:
+    address = {"street": f"Main {i}", "city": "Prague", "zip": "11000", "country": "CZ"}
+    return {
+        "user_id": 1 + i % 100,
+        "shipping_address": address,
+        "billing_address": address,
+        "currency": "CZK",
+    }
+
+
+def bench_single(session: requests.Session, url: str, orders: list) -> float:
+    started = time.perf_counter()
+    for order in orders:
+        r = session.post(f"{url}/orders", json=order)
+        r.raise_for_status()
+    return time.perf_counter() - started
+
+
+def bench_batch(session: requests.Session, url: str, orders: list, batch_size: int) -> float:
+    started = time.perf_counter()
+    for i in range(0, len(orders), batch_size):
+        r = session.post(f"{url}/orders/batch", json=orders[i:i + batch_size])
+        r.raise_for_status()
+        assert len(r.json()["order_ids"]) == len(orders[i:i + batch_size])
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--orders", type=int, default=1000, help="orders created by each path")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    orders = [make_order(i) for i in range(args.orders)]
+    session = requests.Session()
+
+    single = bench_single(session, args.url, orders)
+    batch = bench_batch(session, args.url, orders, args.batch_size)
+
+    print(f"{'path':<28}{'seconds':>10}{'orders/s':>12}")
+    print(f"{'POST /orders':<28}{single:>10.3f}{args.orders / single:>12.1f}")
+    print(f"{f'POST /orders/batch ({args.batch_size})':<28}{batch:>10.3f}{args.orders / batch:>12.1f}")
+    print(f"speedup: {single / batch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Measures requests/s of src/serve.py at several worker counts, serving the
+memory emulator so the database is not part of the measurement.
+
+    python benchmarks/bench_workers.py --workers 1 4 8 --clients 16 --seconds 10
+
+Each worker count gets a fresh launcher; the load comes from --clients
+processes, each reusing one keep-alive connection.
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+EMULATOR = os.path.join(ROOT, "server_emulator_no_db", "memory_server.py")
+
+
+def client(port: int, path: str, seconds: float, results):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                done += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    results.put((done, errors))
+
+
+def wait_until_up(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/report/stock")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("launcher did not start")
+
+
+def run(workers: int, args) -> tuple:
+    launcher = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "src", "serve.py"), "--app", f"{EMULATOR}:app",
+         "--workers", str(workers), "--threads", str(args.threads), "--host", "127.0.0.1", "--port", str(args.port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(args.port)
+        # every worker has to import the app before the numbers mean anything
+        time.sleep(1 + workers * 0.5)
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(target=client, args=(args.port, args.path, args.seconds, results))
+            for _ in range(args.clients)
+        ]
+        for c in clients:
+            c.start()
+        totals = [results.get() for _ in clients]
+        for c in clients:
+            c.join()
+        return sum(d for d, _ in totals), sum(e for _, e in totals)
+    finally:
+        launcher.terminate()
+        launcher.wait(60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--threads", type=int, default=8, help="threads per worker")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent client processes")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--path", default="/orders/all?limit=100")
+    parser.add_argument("--port", type=int, default=5077)
+    args = parser.parse_args()
+
+    print(f"GET {args.path}, {args.clients} clients, {args.seconds:g} s per run, {os.cpu_count()} CPU(s)")
+    print(f"{'workers':>8}{'requests':>10}{'errors':>8}{'req/s':>10}")
+    for workers in args.workers:
+        done, errors = run(workers, args)
+        print(f"{workers:>8}{done:>10}{errors:>8}{done / args.seconds:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
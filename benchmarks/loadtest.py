@@ -0,0 +1,290 @@
+"""
+HTTP load test: runs a mix of user scenarios against the API and reports
+latency percentiles, throughput and error rate per route.
+
+    python benchmarks/loadtest.py                                  # starts the memory emulator
+    python benchmarks/loadtest.py --server api --workers 4         # starts src/server.py (needs the database)
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000      # a server that is already running
+    python benchmarks/loadtest.py --output run.json --baseline last-release.json
+
+Scenarios (weights with --mix):
+    browse    list products and warehouses, open a product, look up its stock
+    checkout  create an order, add items, pay, mark the order paid
+    report    sales report grouped by month and warehouse, stock report
+
+Every client is a process with one keep-alive connection, running
+scenarios back to back.  --output writes the results as JSON; with
+--baseline the run is compared to an earlier one and the exit code is 1
+when a route's p95 or the total throughput got worse than --tolerance.
+"""
+import argparse
+import http.client
+import json
+import math
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from bench_workers import EMULATOR, ROOT, wait_until_up
+
+SERVERS = {
+    "emulator": f"{EMULATOR}:app",
+    "api": "server:app",
+}
+
+
+class Client:
+    """One keep-alive connection; records (route, seconds, ok) per request."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.conn = http.client.HTTPConnection(host, port, timeout=60)
+        self.samples = []
+
+    def call(self, method: str, route: str, path: str, body=None):
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        data = json.dumps(body) if body is not None else None
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, data, headers)
+            response = self.conn.getresponse()
+            payload = response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            payload, ok = b"", False
+        self.samples.append((f"{method} {route}", time.perf_counter() - start, ok))
+        if ok and payload:
+            try:
+                return json.loads(payload)
+            except ValueError:
+                return None
+        return None
+
+
+def browse(client: Client, fixtures: dict, rnd: random.Random):
+    client.call("GET", "/products", "/products?limit=100")
+    client.call("GET", "/warehouses", "/warehouses?limit=100")
+    product_id = rnd.choice(fixtures["products"])
+    client.call("GET", "/products/{id}", f"/products/{product_id}")
+    client.call("GET", "/inventory/product/{id}", f"/inventory/product/{product_id}")
+
+
+def checkout(client: Client, fixtures: dict, rnd: random.Random):
+    order_id = new_order(client, rnd.randint(1, 5000))
+    if order_id is None:
+        return
+    for _ in range(rnd.randint(1, 3)):
+        client.call("POST", "/orders/{id}/items", f"/orders/{order_id}/items",
+                    {"product_id": rnd.choice(fixtures["products"]), "quantity": rnd.randint(1, 3)})
+    client.call("POST", "/payments", "/payments", {
+        "order_id": order_id,
+        "payment_provider": "loadtest",
+        "provider_transaction_id": f"lt-{os.getpid()}-{order_id}",
+    })
+    client.call("PUT", "/orders/{id}", f"/orders/{order_id}", fixtures["paid"])
+
+
+def report(client: Client, fixtures: dict, rnd: random.Random):
+    client.call("GET", "/report/sales", "/report/sales?group_by=month,warehouse")
+    client.call("GET", "/report/stock", "/report/stock")
+
+
+SCENARIOS = {"browse": browse, "checkout": checkout, "report": report}
+
+
+def new_order(client: Client, user_id: int):
+    created = client.call("POST", "/orders/batch", "/orders/batch", [{
+        "user_id": user_id,
+        "shipping_address": f"Armenska {user_id}, Kladno 27201",
+        "billing_address": f"Armenska {user_id}, Kladno 27201",
+        "currency": "CZK",
+    }])
+    return created["order_ids"][0] if created else None
+
+
+def prepare(host: str, port: int, products: int) -> dict:
+    """Creates products up to the wanted count and finds out how an order is marked paid."""
+    client = Client(host, port)
+    order = client.call("GET", "/orders/{id}", f"/orders/{new_order(client, 1)}") or {}
+    if "status_id" in order:
+        # the database keeps lookup ids: PAID and CONFIRMED in order_status / payment_status
+        paid = {"status_id": 3, "payment_status": 2}
+    else:
+        paid = {"status": "PAID", "payment_status": "CONFIRMED"}
+
+    existing = client.call("GET", "/products", f"/products?limit={products}") or {}
+    ids = [p["id"] for p in existing.get("items", [])]
+    for i in range(len(ids), products):
+        client.call("POST", "/products", "/products",
+                    {"product_name": f"Load test product {i}", "unit_price": 100 + i, "tax_rate": 0.21})
+    if len(ids) < products:
+        ids = [p["id"] for p in (client.call("GET", "/products", f"/products?limit={products}") or {}).get("items", [])]
+    if not ids:
+        raise RuntimeError("no products to order; is the server answering?")
+    return {"products": ids, "paid": paid}
+
+
+def run_client(host: str, port: int, fixtures: dict, mix: dict, seconds: float, warmup: float, seed: int, results):
+    rnd = random.Random(seed)
+    client = Client(host, port)
+    names, weights = zip(*mix.items())
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + seconds
+    while time.perf_counter() < deadline:
+        warming_up = time.perf_counter() < measure_from
+        SCENARIOS[rnd.choices(names, weights)[0]](client, fixtures, rnd)
+        if warming_up:
+            client.samples.clear()
+    results.put(client.samples)
+
+
+def percentile(ordered: list, p: float) -> float:
+    # nearest rank
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(samples: list, seconds: float) -> dict:
+    by_route = {}
+    for route, elapsed, ok in samples:
+        by_route.setdefault(route, []).append((elapsed, ok))
+    by_route["TOTAL"] = [(elapsed, ok) for _, elapsed, ok in samples]
+
+    summary = {}
+    for route, values in sorted(by_route.items()):
+        latencies = sorted(elapsed for elapsed, _ in values)
+        errors = sum(1 for _, ok in values if not ok)
+        summary[route] = {
+            "count": len(values),
+            "errors": errors,
+            "error_rate": round(errors / len(values), 4),
+            "rps": round(len(values) / seconds, 1),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+        }
+    return summary
+
+
+def print_table(routes: dict):
+    print(f"{'route':<32}{'count':>8}{'err %':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for route, r in routes.items():
+        print(f"{route:<32}{r['count']:>8}{r['error_rate'] * 100:>7.1f}{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Routes that got slower (p95) or a total throughput that dropped by more than tolerance."""
+    regressions = []
+    for route, now in current["routes"].items():
+        before = baseline["routes"].get(route)
+        if not before or before["count"] < 20:
+            continue
+        if now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        if now["error_rate"] > before["error_rate"] + 0.01:
+            regressions.append(f"{route}: error rate {before['error_rate']:.2%} -> {now['error_rate']:.2%}")
+    now, before = current["routes"]["TOTAL"]["rps"], baseline["routes"]["TOTAL"]["rps"]
+    if now < before * (1 - tolerance):
+        regressions.append(f"TOTAL: {before} -> {now} req/s")
+    return regressions
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def start_server(args) -> subprocess.Popen:
+    launcher = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "src", "serve.py"), "--app", SERVERS[args.server],
+         "--workers", str(args.workers), "--threads", str(args.threads), "--host", "127.0.0.1", "--port", str(args.port)],
+        cwd=os.path.join(ROOT, "src"),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    wait_until_up(args.port)
+    time.sleep(1 + args.workers * 0.5)
+    return launcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="server to test; without it one is started on --port")
+    parser.add_argument("--server", choices=list(SERVERS), default="emulator", help="app to start when --url is not given")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes of the started server")
+    parser.add_argument("--threads", type=int, default=8, help="threads per worker of the started server")
+    parser.add_argument("--port", type=int, default=5078)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client processes")
+    parser.add_argument("--seconds", type=float, default=20, help="measured duration")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds run before measuring")
+    parser.add_argument("--mix", type=parse_mix, default="browse=60,checkout=30,report=10")
+    parser.add_argument("--products", type=int, default=50, help="products created up front if missing")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against --baseline")
+    args = parser.parse_args()
+
+    launcher = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        launcher = start_server(args)
+        host, port = "127.0.0.1", args.port
+    try:
+        fixtures = prepare(host, port, args.products)
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(target=run_client, args=(host, port, fixtures, args.mix, args.seconds,
+                                                             args.warmup, args.seed + i, results))
+            for i in range(args.clients)
+        ]
+        for c in clients:
+            c.start()
+        samples = [s for _ in clients for s in results.get()]
+        for c in clients:
+            c.join()
+    finally:
+        if launcher is not None:
+            launcher.terminate()
+            launcher.wait(60)
+
+    run = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": args.url or args.server,
+        "config": {"clients": args.clients, "seconds": args.seconds, "mix": args.mix, "workers": args.workers,
+                   "threads": args.threads, "cpus": os.cpu_count()},
+        "routes": summarize(samples, args.seconds),
+    }
+    print(f"{run['target']}, {args.clients} clients, {args.seconds:g} s, mix {args.mix}")
+    print_table(run["routes"])
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(run, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
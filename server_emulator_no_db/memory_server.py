@@ -1,20 +1,46 @@
-from flask import Flask, abort, jsonify, request, g
+from flask import Flask, Response, abort, jsonify, request, g, has_request_context
 from flask_cors import CORS
-import secrets
+from functools import partial, wraps
+import atexit
+import csv
+import hashlib
+import io
+import os
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableMapping
+from contextlib import contextmanager
 from copy import deepcopy
+from itertools import islice
+from operator import attrgetter
+
+# modules of the real server that don't need a database
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from compression import Compressor, compression
+from metrics import RequestMetrics
+from token_store import MemoryTokenStore, SQLiteTokenStore
+from persistence import Persistence
 
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["ETag"])
+Compressor(app, min_size=int(os.getenv("COMPRESS_MIN_SIZE", 1024)))
+# first, so request timings include the wait for the storage lock
+metrics = RequestMetrics(app)
 
 # -------------------- in-memory storage --------------------
-loggedUsers = []
+token_store_options = dict(ttl=float(os.getenv("TOKEN_TTL", 28800)), max_tokens=int(os.getenv("TOKEN_MAX", 10000)))
+tokens = (
+    SQLiteTokenStore(os.getenv("TOKEN_STORE_PATH"), **token_store_options) if os.getenv("TOKEN_STORE_PATH")
+    else MemoryTokenStore(**token_store_options)
+)
 
 db = {
     "orders": {1: {
         "id": 1,
         "id_user": 1,
         "status": "CREATED",
-        "total_amount": 0,
+        "total_amount": 2057.0,
         "unit_price": 0,
         "tax_rate": 0,
         "currency": "CZK",
@@ -29,7 +55,9 @@ db = {
         "id": 1,
         "order_id": 1,
         "product_id": 1,
-        "quantity": 1
+        "quantity": 1,
+        "unit_price": 1700,
+        "tax_rate": 0.21
     }},   # dict: item_id -> item
     "products": {1: {"id": 1, "product_name": "ThinkPad X270", "unit_price": 1700, "tax_rate": 0.21}},      # dict: product_id -> product
     "warehouses": {1: {"id": 1, "warehouse_name": "Main", "location_code": "PRG1", "is_active": True}}, 
@@ -47,14 +75,488 @@ counters = {
     "payments": 1
 }
 
+# write counters per table, the emulator's stand-in for the table_versions triggers
+versions = {table: 0 for table in counters}
+
 order_status_lookup = ["CREATED", "AWAITING_PAYMENT", "PAID", "PACKING", "SHIPPED", "CANCELLED"]
 payment_status_lookup = ["INITIATED", "CONFIRMED", "FAILED", "REFUNDED"]
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_ORDER_BATCH = 10000
+
+# -------------------- compact rows --------------------
+class Row(MutableMapping):
+    """
+    A row of one of the large tables, read and written like a dict but kept
+    in __slots__: no per-row hash table and no per-row key strings.  Columns
+    with a lookup list hold the index of their value, repeated strings are
+    interned, and keys outside the columns go to a small extra dict.
+    Responses get plain dicts from to_dict().
+    """
+
+    __slots__ = ("extra",)
+    columns = ()
+    lookups = {}    # column -> list of values stored by their index
+    interned = ()
+
+    def __init__(self, values=()):
+        self.extra = None
+        for column in self.columns:
+            setattr(self, column, None)
+        self.update(values)
+
+    def __getitem__(self, key):
+        getter = self._getters.get(key)
+        if getter is not None:
+            return getter(self)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._column_set:
+            codes = self._codes.get(key)
+            if codes is not None and value in codes:
+                value = codes[value]
+            elif key in self.interned and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._column_set or not self.extra or key not in self.extra:
+            raise KeyError(key)
+        del self.extra[key]
+
+    def __iter__(self):
+        yield from self.columns
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return len(self.columns) + len(self.extra or ())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self):
+        row = {column: getattr(self, column) for column in self.columns}
+        for column, lookup in self.lookups.items():
+            if type(row[column]) is int:
+                row[column] = lookup[row[column]]
+        if self.extra:
+            row.update(self.extra)
+        return row
+
+    def dump(self):
+        # raw slot values for snapshots: no class reference, no key strings
+        return tuple(getattr(self, column) for column in self.columns) + (self.extra,)
+
+    @classmethod
+    def load(cls, columns, values):
+        if tuple(columns) != cls.columns:
+            row = cls(dict(zip(columns, values)))
+            row.extra = values[-1]
+            return row
+        row = cls.__new__(cls)
+        for column, value in zip(columns, values):
+            setattr(row, column, value)
+        row.extra = values[-1]
+        return row
+
+    def __init_subclass__(cls):
+        super().__init_subclass__()
+        cls._column_set = frozenset(cls.columns)
+        cls._codes = {column: {value: i for i, value in enumerate(lookup)} for column, lookup in cls.lookups.items()}
+        cls._getters = {column: attrgetter(column) for column in cls.columns}
+        for column, lookup in cls.lookups.items():
+            cls._getters[column] = partial(decode, attrgetter(column), lookup)
+
+
+def decode(get, lookup, row):
+    value = get(row)
+    return lookup[value] if type(value) is int else value
+
+
+class OrderRow(Row):
+    columns = ("id", "id_user", "status", "total_amount", "unit_price", "tax_rate", "currency", "payment_status",
+               "warehouse_id", "shipping_address", "billing_address", "created_at", "updated_at")
+    __slots__ = columns
+    lookups = {"status": order_status_lookup, "payment_status": payment_status_lookup}
+    interned = ("currency", "shipping_address", "billing_address", "created_at", "updated_at")
+
+
+class OrderItemRow(Row):
+    columns = ("id", "order_id", "product_id", "quantity", "unit_price", "tax_rate")
+    __slots__ = columns
+
+
+class InventoryRow(Row):
+    columns = ("id", "warehouse_id", "product_id", "quantity_available", "quantity_reserved")
+    __slots__ = columns
+
+
+ROW_TYPES = {"orders": OrderRow, "order_items": OrderItemRow, "inventory": InventoryRow}
+
+# column lists of columnar responses, sent even when there are no rows
+TABLE_COLUMNS = {
+    **{table: list(row_type.columns) for table, row_type in ROW_TYPES.items()},
+    "products": ["id", "product_name", "unit_price", "tax_rate"],
+    "warehouses": ["id", "warehouse_name", "location_code", "is_active"],
+    "payments": ["id", "order_id", "payment_provider", "provider_transaction_id"],
+}
+
+def as_row(table, row):
+    row_type = ROW_TYPES.get(table)
+    return row_type(row) if row_type is not None and not isinstance(row, row_type) else row
+
+def as_dict(row):
+    return row.to_dict() if isinstance(row, Row) else row
+
+class IdRows(dict):
+    """
+    id -> row, for tables and index buckets.  The ids are also kept in a
+    sorted list, so a keyset page starts with a bisect instead of scanning
+    from the first row.  Deleted ids stay in the list, skipped, until they
+    make up half of it.
+    """
+
+    __slots__ = ("ids", "stale")
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.ids = sorted(self)
+        self.stale = 0
+
+    def __setitem__(self, row_id, row):
+        if row_id not in self:
+            ids = self.ids
+            if not ids or row_id > ids[-1]:
+                ids.append(row_id)
+            else:
+                i = bisect_left(ids, row_id)
+                if i < len(ids) and ids[i] == row_id:
+                    self.stale -= 1
+                else:
+                    ids.insert(i, row_id)
+        super().__setitem__(row_id, row)
+
+    def __delitem__(self, row_id):
+        super().__delitem__(row_id)
+        self._forget()
+
+    def pop(self, row_id, *default):
+        found = row_id in self
+        value = super().pop(row_id, *default)
+        if found:
+            self._forget()
+        return value
+
+    def _forget(self):
+        self.stale += 1
+        if self.stale * 2 > len(self.ids):
+            self.ids = [row_id for row_id in self.ids if row_id in self]
+            self.stale = 0
+
+    def after(self, after_id):
+        """Rows with an id above after_id, in id order."""
+        ids = self.ids
+        for i in range(bisect_right(ids, after_id), len(ids)):
+            row = self.get(ids[i])
+            if row is not None:
+                yield row
+
+def compact_tables():
+    for table, rows in db.items():
+        db[table] = IdRows((row_id, as_row(table, row)) for row_id, row in rows.items())
+
+compact_tables()
+
+# -------------------- locking --------------------
+class RWLock:
+    """
+    Many readers or one writer.  A waiting writer holds off new readers, so
+    a steady stream of report requests cannot starve the writes.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+# guards db, indexes and versions; every request holds it (see lock_storage)
+storage = RWLock()
+id_lock = threading.Lock()
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# -------------------- secondary indexes --------------------
+class HashIndex:
+    """
+    Rows of one table by the value of some columns.
+    A unique index maps each key to a single row.  Buckets are IdRows, so
+    they page like the table itself.
+    """
+
+    def __init__(self, *fields, unique=False):
+        self.fields = fields
+        self.unique = unique
+        self.entries = {}
+
+    def key(self, row):
+        if len(self.fields) == 1:
+            return row.get(self.fields[0])
+        return tuple(row.get(f) for f in self.fields)
+
+    def add(self, row):
+        key = self.key(row)
+        if self.unique:
+            self.entries[key] = row
+            return
+        bucket = self.entries.get(key)
+        if bucket is None:
+            bucket = self.entries[key] = IdRows()
+        bucket[row["id"]] = row
+
+    def remove(self, row, key=None):
+        # key: the row's key before an update changed it
+        key = self.key(row) if key is None else key
+        if self.unique:
+            if self.entries.get(key) is row:
+                del self.entries[key]
+            return
+        bucket = self.entries.get(key)
+        if bucket is not None:
+            bucket.pop(row["id"], None)
+            if not bucket:
+                del self.entries[key]
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def rows(self, key):
+        return (self.entries.get(key) or {}).values()
+
+    def bucket(self, key):
+        return self.entries.get(key) or IdRows()
+
+
+class OrderTotals:
+    """
+    Running SUM(quantity) and SUM(unit_price * quantity * (1 + tax_rate))
+    per order, the aggregates of v_sales_report.  Kept with the indexes so
+    every item insert, delete and price or quantity change updates them; the
+    key holds the summed values, so update_row passes the old ones back.
+    """
+
+    fields = ("order_id", "quantity", "unit_price", "tax_rate")
+
+    def __init__(self):
+        self.entries = {}  # order_id -> [line_count, total_items, total_amount_calculated]
+
+    def key(self, row):
+        return tuple(row.get(f) for f in self.fields)
+
+    def add(self, row):
+        order_id, quantity, unit_price, tax_rate = self.key(row)
+        acc = self.entries.setdefault(order_id, [0, 0, 0])
+        acc[0] += 1
+        acc[1] += quantity
+        acc[2] += unit_price * quantity * (1 + tax_rate)
+
+    def remove(self, row, key=None):
+        order_id, quantity, unit_price, tax_rate = self.key(row) if key is None else key
+        acc = self.entries.get(order_id)
+        if acc is None:
+            return
+        acc[0] -= 1
+        if not acc[0]:
+            del self.entries[order_id]
+            return
+        acc[1] -= quantity
+        acc[2] -= unit_price * quantity * (1 + tax_rate)
+
+    def get(self, order_id):
+        # (total_items, total_amount_calculated); NULLs for an order without
+        # items, like the LEFT JOIN in the view
+        acc = self.entries.get(order_id)
+        return (acc[1], acc[2]) if acc else (None, None)
+
+
+indexes = {
+    "order_items": {"order_id": HashIndex("order_id"), "totals": OrderTotals()},
+    "inventory": {
+        "warehouse_id": HashIndex("warehouse_id"),
+        "product_id": HashIndex("product_id"),
+        # the unique ix on inventory (warehouse_id, product_id)
+        "pair": HashIndex("warehouse_id", "product_id", unique=True),
+    },
+}
+
+def rebuild_indexes():
+    for table, table_indexes in indexes.items():
+        for index in table_indexes.values():
+            index.entries.clear()
+            for row in db[table].values():
+                index.add(row)
+
+# every write goes through these three, which keep the indexes and the
+# write-ahead log up to date
+def insert_row(table, row):
+    row = as_row(table, row)
+    db[table][row["id"]] = row
+    for index in indexes.get(table, {}).values():
+        index.add(row)
+    log_write(["i", table, as_dict(row)])
+    return row
+
+def update_row(table, row, changes):
+    old_keys = [(index, index.key(row)) for index in indexes.get(table, {}).values()]
+    row.update(changes)
+    for index, old_key in old_keys:
+        if index.key(row) != old_key:
+            index.remove(row, old_key)
+            index.add(row)
+    log_write(["u", table, row["id"], changes])
+
+def delete_row(table, row_id):
+    row = db[table].pop(row_id, None)
+    if row is not None:
+        for index in indexes.get(table, {}).values():
+            index.remove(row)
+        log_write(["d", table, row_id])
+    return row
+
+@metrics.registry.collector
+def storage_metrics():
+    yield "eshop_emulator_rows", "gauge", "Rows per emulator table.", ("table",), {
+        (table,): len(rows) for table, rows in db.items()}
+    if persistence is not None:
+        stats = persistence.stats()
+        yield "eshop_emulator_wal_commits_total", "counter", "Requests written to the write-ahead log.", (), {
+            (): stats["commits"]}
+        yield "eshop_emulator_wal_syncs_total", "counter", "fsyncs of the write-ahead log.", (), {(): stats["syncs"]}
+
+# -------------------- persistence --------------------
+# optional: EMULATOR_DATA_DIR keeps the tables across restarts (one worker only)
+persistence = None
+
+def log_write(op):
+    if persistence is None:
+        return
+    if has_request_context():
+        # written as one line when the request ends, see unlock_storage
+        g.setdefault("wal_ops", []).append(op)
+    else:
+        persistence.commit([op], versions)
+
+def replay(op):
+    kind, table = op[0], op[1]
+    if kind == "i":
+        db[table][op[2]["id"]] = as_row(table, op[2])
+        counters[table] = max(counters[table], op[2]["id"] + 1)
+    elif kind == "u":
+        db[table][op[2]].update(op[3])
+    elif kind == "d":
+        db[table].pop(op[2], None)
+
+def storage_state():
+    tables = {}
+    for table, rows in db.items():
+        row_type = ROW_TYPES.get(table)
+        tables[table] = dict(rows) if row_type is None else (row_type.columns, [row.dump() for row in rows.values()])
+    return {"db": tables, "counters": counters, "versions": versions}
+
+def recover(store):
+    state, transactions = store.recover()
+    if state is not None:
+        for table in db:
+            rows = state["db"].get(table, {})
+            if isinstance(rows, tuple):
+                columns, packed = rows
+                rows = {values[0]: ROW_TYPES[table].load(columns, values) for values in packed}
+            db[table] = rows
+        counters.update(state["counters"])
+        versions.update(state["versions"])
+        compact_tables()
+    replayed = 0
+    for transaction in transactions:
+        for op in transaction["ops"]:
+            replay(op)
+        versions.update(transaction["versions"])
+        replayed += len(transaction["ops"])
+    rebuild_indexes()
+    store.open()
+    if state is None:
+        # the first start persists the seed rows
+        store.snapshot(storage_state())
+    store.records_since_snapshot = replayed
+
+if os.getenv("EMULATOR_DATA_DIR"):
+    persistence = Persistence(
+        os.getenv("EMULATOR_DATA_DIR"),
+        sync_interval=float(os.getenv("WAL_SYNC_INTERVAL", 1)),
+        snapshot_records=int(os.getenv("SNAPSHOT_RECORDS", 1000000)),
+    )
+    recover(persistence)
+    persistence.start(storage_state, storage.read)
+    atexit.register(persistence.close)
+else:
+    rebuild_indexes()
+
 # -------------------- helper functions --------------------
 def next_id(table):
-    i = counters[table]
-    counters[table] += 1
-    return i
+    with id_lock:
+        i = counters[table]
+        counters[table] += 1
+        return i
 
 def get_order(order_id):
     return db["orders"].get(order_id)
@@ -68,10 +570,98 @@ def get_product(product_id):
 def get_warehouse(warehouse_id):
     return db["warehouses"].get(warehouse_id)
 
+def written_tables(path):
+    segment = path.strip("/").split("/")[0]
+    if segment == "orders" and "/items" in path:
+        return ("orders", "order_items")
+    return (segment,) if segment in versions else ()
+
+@app.before_request
+def lock_storage():
+    # a read lock for reads, the write lock for everything else; the version
+    # bump in after_request still runs under it, before teardown lets go
+    if request.method in READ_METHODS:
+        storage.acquire_read()
+        g.storage_release = storage.release_read
+    else:
+        storage.acquire_write()
+        g.storage_release = storage.release_write
+
+@app.teardown_request
+def unlock_storage(exc):
+    release = g.pop("storage_release", None)
+    try:
+        ops = g.pop("wal_ops", None)
+        if ops:
+            persistence.commit(ops, versions)
+    finally:
+        if release is not None:
+            release()
+
+@app.after_request
+def bump_versions(response):
+    if request.method in ("POST", "PUT", "DELETE") and response.status_code < 400:
+        for table in written_tables(request.path):
+            versions[table] += 1
+    return response
+
+def versioned(*tables):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = f"{[versions[t] for t in tables]}|{request.full_path}|{request.headers.get('Accept', '')}"
+            etag = hashlib.sha1(key.encode()).hexdigest()
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+            response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
+
+def page_args():
+    try:
+        after_id = int(request.args.get("after_id", 0))
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        abort(400, "after_id and limit must be integers")
+    if limit < 1:
+        abort(400, "limit must be positive")
+    return after_id, min(limit, MAX_PAGE_SIZE)
+
+COLUMNAR_MIMETYPE = "application/vnd.eshop.columnar+json"
+
+def wants_columnar():
+    fmt = request.args.get("format")
+    if fmt is not None:
+        if fmt not in ("json", "columnar"):
+            abort(400, "format must be one of: json, columnar")
+        return fmt == "columnar"
+    return request.accept_mimetypes.best_match(["application/json", COLUMNAR_MIMETYPE]) == COLUMNAR_MIMETYPE
+
+def rows_response(rows, columns, **extra):
+    # same shapes as the real server: a list of objects, or columns + row arrays
+    if wants_columnar():
+        body = {"columns": columns, "rows": [[r.get(c) for c in columns] for r in rows], **extra}
+        response = app.response_class(app.json.dumps(body, separators=(",", ":")), mimetype=COLUMNAR_MIMETYPE)
+    else:
+        response = jsonify({"items": rows, **extra} if extra else rows)
+    response.vary.add("Accept")
+    return response
+
+def paginate(rows, table):
+    # rows: the IdRows of a table or index bucket
+    after_id, limit = page_args()
+    page = list(islice(rows.after(after_id), limit + 1))
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = page[-1]["id"]
+    return rows_response([as_dict(r) for r in page], TABLE_COLUMNS[table], next_cursor=next_cursor)
+
 # -------------------- orders --------------------
-@app.route("/orders", methods=["POST"])
-def create_order():
-    data = request.json
+def new_order(data):
     order_id = next_id("orders")
     order = {
         "id": order_id,
@@ -88,64 +678,113 @@ def create_order():
         "created_at": "2025-12-23T00:00:00",
         "updated_at": "2025-12-23T00:00:00"
     }
-    db["orders"][order_id] = order
+    insert_row("orders", order)
+    return order_id
+
+@app.route("/orders", methods=["POST"])
+def create_order():
+    order_id = new_order(request.json)
     return jsonify({"status": "created", "order_id": order_id}), 201
 
+@app.route("/orders/batch", methods=["POST"])
+def create_orders_batch():
+    data = request.json
+    if not isinstance(data, list) or not data:
+        abort(400, "Expected a non-empty JSON array of orders")
+    if len(data) > MAX_ORDER_BATCH:
+        abort(400, f"At most {MAX_ORDER_BATCH} orders per batch")
+    required_fields = ["user_id", "shipping_address", "billing_address", "currency"]
+    for i, order in enumerate(data):
+        if not isinstance(order, dict) or not all(field in order for field in required_fields):
+            abort(400, f"Order {i}: missing required fields: user_id, shipping_address, billing_address, currency")
+    return jsonify({"status": "created", "order_ids": [new_order(order) for order in data]}), 201
+
 @app.route("/orders/<int:order_id>", methods=["GET"])
 def get_order_route(order_id):
     order = get_order(order_id)
     if not order:
         abort(404)
-    return jsonify(order)
+    return jsonify(as_dict(order))
 
 @app.route("/orders/<int:order_id>", methods=["PUT"])
 def update_order(order_id):
     order = get_order(order_id)
     if not order:
         abort(404)
-    order.update(request.json)
+    update_row("orders", order, request.json)
     return jsonify({"status": "updated"})
 
 @app.route("/orders/<int:order_id>", methods=["DELETE"])
 def delete_order(order_id):
-    if order_id in db["orders"]:
-        del db["orders"][order_id]
+    delete_row("orders", order_id)
     return jsonify({"status": "deleted"})
 
 @app.route("/orders/all", methods=["GET"])
+@versioned("orders")
 def get_all_orders():
-    return jsonify(list(db["orders"].values()))
+    return paginate(db["orders"], "orders")
 
 # -------------------- order items --------------------
+def add_order_item(order, product, quantity):
+    # same as tg_order_item_add: price and tax are copied from the product
+    # and the line (rounded to cents) is added to the order total
+    item_id = next_id("order_items")
+    item = {
+        "id": item_id,
+        "order_id": order["id"],
+        "product_id": product["id"],
+        "quantity": quantity,
+        "unit_price": product["unit_price"],
+        "tax_rate": product["tax_rate"]
+    }
+    item = insert_row("order_items", item)
+    line_total = round(product["unit_price"] * quantity * (1 + product["tax_rate"]), 2)
+    update_row("orders", order, {"total_amount": round(order["total_amount"] + line_total, 2)})
+    return item
+
 @app.route("/orders/<int:order_id>/items", methods=["POST"])
 def add_item_to_order(order_id):
     order = get_order(order_id)
     if not order:
         abort(404)
     data = request.json
-    item_id = next_id("order_items")
-    item = {
-        "id": item_id,
-        "order_id": order_id,
-        "product_id": data["product_id"],
-        "quantity": data["quantity"]
-    }
-    db["order_items"][item_id] = item
-    return jsonify(item)
+    product = get_product(data["product_id"])
+    if not product:
+        abort(400, "Invalid product")
+    return jsonify(as_dict(add_order_item(order, product, data["quantity"])))
+
+@app.route("/orders/<int:order_id>/items/bulk", methods=["POST"])
+def add_items_to_order(order_id):
+    order = get_order(order_id)
+    if not order:
+        abort(404)
+    data = request.json
+    if not isinstance(data, list) or not data:
+        abort(400, "Expected a non-empty JSON array of items")
+    for i, item in enumerate(data):
+        if not isinstance(item, dict) or "product_id" not in item or "quantity" not in item:
+            abort(400, f"Item {i}: missing required fields: product_id, quantity")
+    # all products are checked before anything is added, like the procedure's rollback
+    products = [get_product(item["product_id"]) for item in data]
+    if not all(products):
+        abort(400, "Invalid product")
+    for item, product in zip(data, products):
+        add_order_item(order, product, item["quantity"])
+    return jsonify({"status": "created", "count": len(data)}), 201
 
 @app.route("/orders/<int:order_id>/items", methods=["DELETE"])
 def remove_item_from_order(order_id):
     data = request.json
-    items_to_delete = [k for k, v in db["order_items"].items()
-                       if v["order_id"] == order_id and v.get("product_name") == data.get("name")]
+    items_to_delete = [v["id"] for v in indexes["order_items"]["order_id"].rows(order_id)
+                       if (get_product(v["product_id"]) or {}).get("product_name") == data.get("name")]
     for k in items_to_delete:
-        del db["order_items"][k]
+        delete_row("order_items", k)
     return jsonify({"deleted": len(items_to_delete)})
 
 @app.route("/orders/<int:order_id>/items", methods=["GET"])
+@versioned("order_items")
 def get_all_items_from_order(order_id):
-    items = [v for v in db["order_items"].values() if v["order_id"] == order_id]
-    return jsonify(items)
+    return paginate(indexes["order_items"]["order_id"].bucket(order_id), "order_items")
 
 # -------------------- products --------------------
 @app.route("/products", methods=["POST"])
@@ -158,7 +797,7 @@ def create_product():
         "unit_price": data["unit_price"],
         "tax_rate": data["tax_rate"]
     }
-    db["products"][product_id] = product
+    insert_row("products", product)
     return jsonify({"status": "created"}), 201
 
 @app.route("/products/<int:product_id>", methods=["GET"])
@@ -173,22 +812,23 @@ def update_product(product_id):
     product = get_product(product_id)
     if not product:
         abort(404)
-    product.update(request.json)
+    update_row("products", product, request.json)
     return jsonify({"status": "updated"})
 
 @app.route("/products/<int:product_id>", methods=["DELETE"])
 def delete_product(product_id):
-    if product_id in db["products"]:
-        del db["products"][product_id]
+    delete_row("products", product_id)
     return jsonify({"status": "deleted"})
 
 @app.route("/products", methods=["GET"])
+@versioned("products")
 def list_products():
-    return jsonify(list(db["products"].values()))
+    return paginate(db["products"], "products")
 
 @app.route("/products/all", methods=["GET"])
+@versioned("products")
 def get_all_products():
-    return jsonify(list(db["products"].values()))
+    return paginate(db["products"], "products")
 
 # -------------------- warehouses --------------------
 @app.route("/warehouses", methods=["POST"])
@@ -201,7 +841,7 @@ def create_warehouse():
         "location_code": data["location_code"],
         "is_active": data["is_active"]
     }
-    db["warehouses"][warehouse_id] = warehouse
+    insert_row("warehouses", warehouse)
     return jsonify({"status": "created"}), 201
 
 @app.route("/warehouses/<int:warehouse_id>", methods=["GET"])
@@ -216,22 +856,23 @@ def update_warehouse(warehouse_id):
     wh = get_warehouse(warehouse_id)
     if not wh:
         abort(404)
-    wh.update(request.json)
+    update_row("warehouses", wh, request.json)
     return jsonify({"status": "updated"})
 
 @app.route("/warehouses/<int:warehouse_id>", methods=["DELETE"])
 def delete_warehouse(warehouse_id):
-    if warehouse_id in db["warehouses"]:
-        del db["warehouses"][warehouse_id]
+    delete_row("warehouses", warehouse_id)
     return jsonify({"status": "deleted"})
 
 @app.route("/warehouses", methods=["GET"])
+@versioned("warehouses")
 def list_warehouses():
-    return jsonify(list(db["warehouses"].values()))
+    return paginate(db["warehouses"], "warehouses")
 
 @app.route("/warehouses/all", methods=["GET"])
+@versioned("warehouses")
 def get_all_warehouses():
-    return jsonify(list(db["warehouses"].values()))
+    return paginate(db["warehouses"], "warehouses")
 
 # -------------------- inventory --------------------
 @app.route("/inventory", methods=["POST"])
@@ -245,43 +886,97 @@ def create_inventory():
         "quantity_available": data["quantity_available"],
         "quantity_reserved": data.get("quantity_reserved", 0)
     }
-    db["inventory"][item_id] = item
+    if indexes["inventory"]["pair"].get((item["warehouse_id"], item["product_id"])):
+        abort(400, "Inventory for this warehouse and product already exists")
+    insert_row("inventory", item)
     return jsonify({"status": "created"}), 201
 
+def parse_inventory_row(record):
+    try:
+        warehouse_id = int(record["warehouse_id"])
+        product_id = int(record["product_id"])
+        quantity_available = int(record["quantity_available"])
+        reserved = record.get("quantity_reserved")
+        quantity_reserved = int(reserved) if reserved not in (None, "") else None
+    except (KeyError, TypeError, ValueError):
+        return None
+    if quantity_available < 0 or (quantity_reserved is not None and quantity_reserved < 0):
+        return None
+    return warehouse_id, product_id, quantity_available, quantity_reserved
+
+@app.route("/inventory/import", methods=["POST"])
+def import_inventory_csv():
+    reader = csv.DictReader(io.TextIOWrapper(request.stream, encoding="utf-8", newline=""))
+    missing = [f for f in ("warehouse_id", "product_id", "quantity_available") if f not in (reader.fieldnames or [])]
+    if missing:
+        abort(400, "CSV header is missing: " + ", ".join(missing))
+
+    by_pair = indexes["inventory"]["pair"]
+    counts = {"inserted": 0, "updated": 0, "rejected": 0}
+    for record in reader:
+        row = parse_inventory_row(record)
+        if row is None or row[0] not in db["warehouses"] or row[1] not in db["products"]:
+            counts["rejected"] += 1
+            continue
+        warehouse_id, product_id, quantity_available, quantity_reserved = row
+        item = by_pair.get((warehouse_id, product_id))
+        if item:
+            changes = {"quantity_available": quantity_available}
+            if quantity_reserved is not None:
+                changes["quantity_reserved"] = quantity_reserved
+            update_row("inventory", item, changes)
+            counts["updated"] += 1
+        else:
+            item_id = next_id("inventory")
+            item = {
+                "id": item_id,
+                "warehouse_id": warehouse_id,
+                "product_id": product_id,
+                "quantity_available": quantity_available,
+                "quantity_reserved": quantity_reserved or 0
+            }
+            insert_row("inventory", item)
+            counts["inserted"] += 1
+    return jsonify(counts)
+
 @app.route("/inventory/<int:item_id>", methods=["GET"])
 def get_inventory_route(item_id):
     item = get_inventory_item(item_id)
     if not item:
         abort(404)
-    return jsonify(item)
+    return jsonify(as_dict(item))
 
 @app.route("/inventory/<int:item_id>", methods=["PUT"])
 def update_inventory_route(item_id):
     item = get_inventory_item(item_id)
     if not item:
         abort(404)
-    item.update(request.json)
+    changes = {k: v for k, v in request.json.items() if k != "id"}
+    pair = (changes.get("warehouse_id", item["warehouse_id"]), changes.get("product_id", item["product_id"]))
+    if indexes["inventory"]["pair"].get(pair) not in (None, item):
+        abort(400, "Inventory for this warehouse and product already exists")
+    update_row("inventory", item, changes)
     return jsonify({"status": "updated"})
 
 @app.route("/inventory/<int:item_id>", methods=["DELETE"])
 def delete_inventory_route(item_id):
-    if item_id in db["inventory"]:
-        del db["inventory"][item_id]
+    delete_row("inventory", item_id)
     return jsonify({"status": "deleted"})
 
 @app.route("/inventory/all", methods=["GET"])
+@versioned("inventory")
 def list_inventory():
-    return jsonify(list(db["inventory"].values()))
+    return paginate(db["inventory"], "inventory")
 
 @app.route("/inventory/warehouse/<int:warehouse_id>", methods=["GET"])
+@versioned("inventory")
 def list_inventory_by_warehouse(warehouse_id):
-    items = [v for v in db["inventory"].values() if v["warehouse_id"] == warehouse_id]
-    return jsonify(items)
+    return paginate(indexes["inventory"]["warehouse_id"].bucket(warehouse_id), "inventory")
 
 @app.route("/inventory/product/<int:product_id>", methods=["GET"])
+@versioned("inventory")
 def list_inventory_by_product(product_id):
-    items = [v for v in db["inventory"].values() if v["product_id"] == product_id]
-    return jsonify(items)
+    return paginate(indexes["inventory"]["product_id"].bucket(product_id), "inventory")
 
 # -------------------- payments --------------------
 @app.route("/payments", methods=["POST"])
@@ -294,92 +989,225 @@ def create_payment():
         "payment_provider": data["payment_provider"],
         "provider_transaction_id": data["provider_transaction_id"]
     }
-    db["payments"][payment_id] = payment
+    insert_row("payments", payment)
     return jsonify({"status": "created"}), 201
 
 # -------------------- reports --------------------
-from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # ==========================
 # Sales report
 # ==========================
-@app.route("/report/sales", methods=["GET"])
-def report_sales():
-    sales_report = []
+def sales_report_pairs(orders=None):
+    # v_sales_report: inner join on warehouses, item aggregates kept up to date
+    # by OrderTotals, so a report costs one dict lookup per order
+    totals = indexes["order_items"]["totals"]
+    for order in db["orders"].values() if orders is None else orders:
+        warehouse = get_warehouse(order.get("warehouse_id"))
+        if warehouse is None:
+            continue
+        total_items, total_amount_calculated = totals.get(order["id"])
 
-    # Group order items by order_id
-    items_by_order = defaultdict(list)
-    for item in db["order_items"].values():
-        items_by_order[item["order_id"]].append(item)
-
-    for k, order in db["orders"].items():
-        order_id = order["id"]
-        items = items_by_order[order_id]
-
-        total_items = sum(item["quantity"] for item in items)
-        total_amount_calculated = sum(item["unit_price"] * item["quantity"] * (1 + item.get("tax_rate", 0.21)) for item in items)
-
-        # Get warehouse name safely
-        warehouse = next((w for k, w in db.get("warehouses", []).items() if w.get("id") == order.get("warehouse_id")), {})
-        warehouse_name = warehouse.get("warehouse_name", "UNKNOWN")
-
-        sales_report.append({
-            "order_id": order_id,
-            "user_id": order["user_id"],
+        yield order, {
+            "order_id": order["id"],
+            "user_id": order["id_user"],
             "order_status": order["status"],
             "payment_status": order["payment_status"],
             "total_amount": order["total_amount"],
             "currency": order["currency"],
-            "warehouse_name": warehouse_name,
+            "warehouse_name": warehouse["warehouse_name"],
             "created_at": order["created_at"],
             "total_items": total_items,
             "total_amount_calculated": total_amount_calculated
-        })
+        }
+
+def sales_report_rows(orders=None):
+    return (row for _, row in sales_report_pairs(orders))
 
-    return jsonify(sales_report)
+def week_start(created_at):
+    day = datetime.fromisoformat(created_at).date()
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+# same options and output columns as SalesReportGateway.buildQuery
+SALES_GROUPS = {
+    "day": lambda order, row: {"day": row["created_at"][:10]},
+    "week": lambda order, row: {"week": week_start(row["created_at"])},
+    "month": lambda order, row: {"month": row["created_at"][:7]},
+    "warehouse": lambda order, row: {"warehouse_id": order["warehouse_id"], "warehouse_name": row["warehouse_name"]},
+    "status": lambda order, row: {"order_status": row["order_status"]},
+    "payment_status": lambda order, row: {"payment_status": row["payment_status"]},
+    "currency": lambda order, row: {"currency": row["currency"]},
+    "all": lambda order, row: {},
+}
+
+SALES_GROUP_COLUMNS = {
+    "day": ["day"], "week": ["week"], "month": ["month"], "warehouse": ["warehouse_id", "warehouse_name"],
+    "status": ["order_status"], "payment_status": ["payment_status"], "currency": ["currency"], "all": [],
+}
+SALES_AGGREGATE_COLUMNS = ["order_count", "total_amount", "total_items", "total_amount_calculated"]
+
+SALES_FILTERS = {
+    "date_from": lambda order, row, v: datetime.fromisoformat(row["created_at"]) >= v,
+    "date_to": lambda order, row, v: datetime.fromisoformat(row["created_at"]) < v,
+    "order_status": lambda order, row, v: row["order_status"] == v,
+    "payment_status": lambda order, row, v: row["payment_status"] == v,
+    "warehouse_id": lambda order, row, v: order["warehouse_id"] == v,
+    "currency": lambda order, row, v: row["currency"] == v,
+}
+
+def sales_report_args():
+    filters = {}
+    for name in ("order_status", "payment_status", "currency"):
+        if request.args.get(name):
+            filters[name] = request.args[name]
+    try:
+        if request.args.get("warehouse_id"):
+            filters["warehouse_id"] = int(request.args["warehouse_id"])
+        for name in ("date_from", "date_to"):
+            if request.args.get(name):
+                filters[name] = datetime.fromisoformat(request.args[name])
+    except ValueError:
+        abort(400, "warehouse_id must be an integer, date_from/date_to ISO dates")
+    group_by = list(dict.fromkeys(g for g in request.args.get("group_by", "").split(",") if g))
+    unknown = [g for g in group_by if g not in SALES_GROUPS]
+    if unknown:
+        abort(400, "unknown report option: " + ", ".join(unknown))
+    return filters, group_by
+
+def aggregate_sales(pairs, group_by):
+    groups = {}
+    for order, row in pairs:
+        key = {}
+        for g in group_by:
+            key.update(SALES_GROUPS[g](order, row))
+        acc = groups.setdefault(tuple(key.items()), dict(key, order_count=0, total_amount=0,
+                                                         total_items=0, total_amount_calculated=0))
+        acc["order_count"] += 1
+        acc["total_amount"] += row["total_amount"]
+        acc["total_items"] += row["total_items"] or 0
+        acc["total_amount_calculated"] += row["total_amount_calculated"] or 0
+    if not groups and all(g == "all" for g in group_by):
+        # an aggregate without GROUP BY still returns one row in SQL
+        return [{"order_count": 0, "total_amount": None, "total_items": None, "total_amount_calculated": None}]
+    return [groups[k] for k in sorted(groups)]
+
+@app.route("/report/sales", methods=["GET"])
+@versioned("orders", "order_items", "warehouses")
+def report_sales():
+    filters, group_by = sales_report_args()
+    pairs = sales_report_pairs()
+    if filters:
+        pairs = ((order, row) for order, row in pairs
+                 if all(SALES_FILTERS[name](order, row, v) for name, v in filters.items()))
+    if group_by:
+        columns = [c for g in group_by for c in SALES_GROUP_COLUMNS[g]] + SALES_AGGREGATE_COLUMNS
+        return rows_response(aggregate_sales(pairs, group_by), columns)
+    return rows_response([row for _, row in pairs], SALES_REPORT_COLUMNS)
 
 
 # ==========================
 # Stock report
 # ==========================
-@app.route("/report/stock", methods=["GET"])
-def report_stock():
-    stock_report = []
-
-    for k, inv in db["inventory"].items():
-        warehouse = next((w for k, w in db["warehouses"].items() if w["id"] == inv["warehouse_id"]), {})
-        product = next((p for p in db["products"].values() if p["id"] == inv["product_id"]), {})
+def stock_report_rows(inventory=None):
+    # v_stock_report: inner joins on warehouses and products
+    for inv in db["inventory"].values() if inventory is None else inventory:
+        warehouse = get_warehouse(inv["warehouse_id"])
+        product = get_product(inv["product_id"])
+        if warehouse is None or product is None:
+            continue
 
-        stock_report.append({
-            "inventory_id": inv.get("id"),
-            "warehouse_name": warehouse.get("warehouse_name", "UNKNOWN"),
-            "product_name": product.get("product_name", "UNKNOWN"),
+        yield {
+            "inventory_id": inv["id"],
+            "warehouse_name": warehouse["warehouse_name"],
+            "product_name": product["product_name"],
             "quantity_available": inv["quantity_available"],
             "quantity_reserved": inv["quantity_reserved"],
             "quantity_total": inv["quantity_available"] + inv["quantity_reserved"]
-        })
+        }
+
+@app.route("/report/stock", methods=["GET"])
+@versioned("inventory", "warehouses", "products")
+def report_stock():
+    return rows_response(list(stock_report_rows()), STOCK_REPORT_COLUMNS)
+
+# ==========================
+# Streaming export (NDJSON / CSV)
+# ==========================
+EXPORT_BATCH_SIZE = 1000
+
+def batched(rows, size):
+    # the body is streamed after the request has released its lock, so each
+    # batch is built under a read lock of its own
+    rows = iter(rows)
+    while True:
+        with storage.read():
+            batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def ndjson_chunks(columns, rows):
+    for batch in batched(rows, EXPORT_BATCH_SIZE):
+        yield "".join(app.json.dumps(row) + "\n" for row in batch)
+
+def csv_chunks(columns, rows):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=columns)
+    writer.writeheader()
+    yield buf.getvalue()
+    for batch in batched(rows, EXPORT_BATCH_SIZE):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(batch)
+        yield buf.getvalue()
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_chunks, "application/x-ndjson"),
+    "csv": (csv_chunks, "text/csv"),
+}
+
+SALES_REPORT_COLUMNS = ["order_id", "user_id", "order_status", "payment_status", "total_amount", "currency",
+                        "warehouse_name", "created_at", "total_items", "total_amount_calculated"]
+STOCK_REPORT_COLUMNS = ["inventory_id", "warehouse_name", "product_name", "quantity_available",
+                        "quantity_reserved", "quantity_total"]
+
+def export_response(name, columns, rows):
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        abort(400, "format must be one of: " + ", ".join(EXPORT_FORMATS))
+    chunks, mimetype = EXPORT_FORMATS[fmt]
+    response = Response(chunks(columns, rows), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{name}.{fmt}"'
+    return response
+
+@app.route("/report/sales/export", methods=["GET"])
+def export_sales_report():
+    # rows are read from a list of the orders taken now; the dict itself may
+    # change size while the export streams
+    return export_response("sales_report", SALES_REPORT_COLUMNS, sales_report_rows(list(db["orders"].values())))
 
-    return jsonify(stock_report)
+@app.route("/report/stock/export", methods=["GET"])
+def export_stock_report():
+    return export_response("stock_report", STOCK_REPORT_COLUMNS, stock_report_rows(list(db["inventory"].values())))
 # -------------------- authorization --------------------
 @app.route('/authorize', methods=['GET'])
+@compression(enabled=False)
 def authorize():
     try:
         password = request.args.get('password')
         if password == "password":
-            token = secrets.token_hex(16)
-            loggedUsers.append(token)
-            return jsonify({"token": token})
+            return jsonify({"token": tokens.issue()})
     except Exception as e:
         abort(500, str(e))
+    abort(401, "Unauthorized")
 
 @app.route('/logout', methods=['DELETE'])
+@compression(enabled=False)
 def logout():
     token = request.args.get("token")
     if not token:
         abort(401, "Missing user token")
-    if token in loggedUsers:
-        loggedUsers.remove(token)
+    if tokens.revoke(token):
         return jsonify({"deleted token": "successfully"})
     return jsonify({"deleted token": "token not found"}), 404
 
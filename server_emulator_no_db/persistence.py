@@ -0,0 +1,154 @@
+import glob
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+SNAPSHOT_FILE = "snapshot.pickle"
+SEGMENT_PATTERN = re.compile(r"wal\.(\d+)\.ndjson$")
+
+
+class Persistence:
+    """
+    Write-ahead log plus snapshots for the emulator's tables.
+
+    Each committed request is one JSON line of row operations in the current
+    log segment.  Lines are fsynced in batches every sync_interval seconds
+    (0 syncs every commit), so a crash loses at most that window.  After
+    snapshot_records operations the whole state is pickled, the log moves to
+    a new segment and the older segments are deleted; startup loads the
+    snapshot and replays the segments written after it.
+    """
+
+    def __init__(self, directory: str, sync_interval: float = 1.0, snapshot_records: int = 1000000):
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.snapshot_records = snapshot_records
+        self.records_since_snapshot = 0
+        self.commits = 0
+        self.syncs = 0
+        self.last_snapshot = None
+        self._segment = 0
+        self._file = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _segment_path(self, n: int) -> str:
+        return os.path.join(self.directory, f"wal.{n:08d}.ndjson")
+
+    def segments(self) -> List[int]:
+        found = (SEGMENT_PATTERN.search(p) for p in glob.glob(os.path.join(self.directory, "wal.*.ndjson")))
+        return sorted(int(m.group(1)) for m in found if m)
+
+    def recover(self) -> Tuple[Optional[Dict[str, Any]], Iterator[dict]]:
+        """Returns the latest snapshot (or None) and the transactions logged after it."""
+        state = None
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        first = state["segment"] if state else 0
+
+        def transactions():
+            for n in self.segments():
+                if n < first:
+                    continue
+                with open(self._segment_path(n), "rb") as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            # torn last line of a crash: that request never committed
+                            break
+
+        return state, transactions()
+
+    def open(self):
+        # always a new segment, never appending behind a torn line
+        segments = self.segments()
+        for n in segments:
+            if os.path.getsize(self._segment_path(n)) == 0:
+                os.remove(self._segment_path(n))
+        self._segment = max(segments, default=0) + 1
+        self._file = open(self._segment_path(self._segment), "a", encoding="utf-8")
+
+    def commit(self, ops: List[list], versions: Dict[str, int]):
+        line = json.dumps({"ops": ops, "versions": versions}, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self.commits += 1
+            self.records_since_snapshot += len(ops)
+            if self.sync_interval <= 0:
+                self._sync_locked()
+            else:
+                self._dirty = True
+
+    def _sync_locked(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._dirty = False
+        self.syncs += 1
+
+    def sync(self):
+        with self._lock:
+            if self._dirty:
+                self._sync_locked()
+
+    def snapshot(self, state: Dict[str, Any]):
+        """
+        Pickles state, which must not change meanwhile (hold off the writers),
+        and drops the log segments it covers.
+        """
+        with self._lock:
+            self._sync_locked()
+            self._file.close()
+            self._segment += 1
+            self._file = open(self._segment_path(self._segment), "a", encoding="utf-8")
+            self.records_since_snapshot = 0
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(dict(state, segment=self._segment), f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        for n in self.segments():
+            if n < self._segment:
+                os.remove(self._segment_path(n))
+        self.last_snapshot = time.time()
+
+    def start(self, state: Callable[[], Dict[str, Any]], exclusive: Callable):
+        """
+        Background thread for the batched fsync and the snapshots.
+        exclusive() is a context manager that keeps writers out.
+        """
+        def run():
+            while True:
+                time.sleep(self.sync_interval if self.sync_interval > 0 else 1.0)
+                self.sync()
+                if self.records_since_snapshot >= self.snapshot_records:
+                    with exclusive():
+                        self.snapshot(state())
+
+        threading.Thread(target=run, name="emulator-wal", daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and not self._file.closed:
+                self._sync_locked()
+                self._file.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "segment": self._segment,
+            "commits": self.commits,
+            "syncs": self.syncs,
+            "records_since_snapshot": self.records_since_snapshot,
+            "snapshot_records": self.snapshot_records,
+            "sync_interval": self.sync_interval,
+            "last_snapshot": self.last_snapshot,
+        }
@@ -0,0 +1,197 @@
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Tuple
+
+
+class WorkloadPool:
+    """
+    Bounded executor for one class of requests.  At most threads requests
+    run at once and at most queue more wait; beyond that requests are
+    turned away with 503 instead of piling up.  Only touched from the event
+    loop thread, so the counters need no lock.
+    """
+
+    def __init__(self, name: str, threads: int, queue: int):
+        self.name = name
+        self.threads = threads
+        self.limit = threads + queue
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"{name}-db")
+        self.admitted = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def admit(self) -> bool:
+        if self.admitted >= self.limit:
+            self.rejected += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def done(self):
+        self.admitted -= 1
+        self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threads": self.threads,
+            "running": min(self.admitted, self.threads),
+            "queued": max(self.admitted - self.threads, 0),
+            "max_queued": self.limit - self.threads,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+class _RequestBody(io.RawIOBase):
+    # wsgi.input fed from ASGI receive(); read on an executor thread
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = b""
+        self._more = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and self._more:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message["type"] == "http.disconnect":
+                self._more = False
+                break
+            self._buffer = message.get("body", b"")
+            self._more = message.get("more_body", False)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def build_environ(scope: dict, body) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": scope["client"][0] if scope.get("client") else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+        value = value.decode("latin-1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+class ExecutorBridge:
+    """
+    ASGI front for a WSGI app.  Connections are held by the event loop;
+    each request runs the WSGI app on the executor of its workload, so a
+    burst of slow report queries can only take the report threads (and their
+    database connections) and never the ones serving /orders writes.
+    Response chunks are sent as the app yields them.
+    """
+
+    def __init__(self, wsgi_app, oltp_threads: int = 16, report_threads: int = 4,
+                 oltp_queue: int = 256, report_queue: int = 16, report_prefixes: Tuple[str, ...] = ("/report",)):
+        self.wsgi_app = wsgi_app
+        self.pools = {
+            "oltp": WorkloadPool("oltp", oltp_threads, oltp_queue),
+            "report": WorkloadPool("report", report_threads, report_queue),
+        }
+        self.report_prefixes = report_prefixes
+
+    def classify(self, path: str) -> str:
+        return "report" if path.startswith(self.report_prefixes) else "oltp"
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        if scope["path"] == "/executor/stats":
+            await self._send_simple(send, 200, self.stats())
+            return
+
+        pool = self.pools[self.classify(scope["path"])]
+        if not pool.admit():
+            await self._send_simple(send, 503, {"error": f"too many queued {pool.name} requests"}, [(b"retry-after", b"1")])
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(pool.executor, self._run_wsgi, scope, receive, send, loop)
+        finally:
+            pool.done()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for pool in self.pools.values():
+                    pool.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _send_simple(send, status: int, body: Any, headers=()):
+        data = json.dumps(body).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode()), *headers],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+    def _run_wsgi(self, scope, receive, send, loop):
+        # runs on an executor thread; every send() waits for the event loop,
+        # so a slow client slows down the producer instead of filling memory
+        def call(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response = {}
+
+        def start_response(status: str, headers: Iterable[Tuple[str, str]], exc_info=None):
+            if exc_info and response.get("started"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+        def start():
+            if not response.get("started"):
+                response["started"] = True
+                call({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+
+        environ = build_environ(scope, io.BufferedReader(_RequestBody(receive, loop)))
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    start()
+                    call({"type": "http.response.body", "body": chunk, "more_body": True})
+            start()
+            call({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            if hasattr(result, "close"):
+                result.close()
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class FileInvalidationChannel:
+    """
+    Cross-process invalidation through marker files in a shared directory.
+
+    publish(namespace) atomically replaces <directory>/<namespace>.gen; every
+    process notices the new inode/mtime the next time it polls and drops its
+    copy of that namespace.  Stands in for a pub/sub channel on a single host.
+    """
+
+    def __init__(self, directory: str, poll_interval: float = 0.5):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        os.makedirs(directory, exist_ok=True)
+        self._seen = {}
+        self._next_poll = {}
+        self._lock = threading.Lock()
+
+    def _path(self, namespace: str) -> str:
+        return os.path.join(self.directory, f"{namespace}.gen")
+
+    def _marker(self, namespace: str):
+        try:
+            st = os.stat(self._path(namespace))
+            return st.st_ino, st.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def publish(self, namespace: str):
+        path = self._path(namespace)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, "w") as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp, path)
+        with self._lock:
+            # our own write is not news to us
+            self._seen[namespace] = self._marker(namespace)
+
+    def changed(self, namespace: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_poll.get(namespace, 0):
+                return False
+            self._next_poll[namespace] = now + self.poll_interval
+        marker = self._marker(namespace)
+        with self._lock:
+            if namespace not in self._seen:
+                self._seen[namespace] = marker
+                return False
+            if marker != self._seen[namespace]:
+                self._seen[namespace] = marker
+                return True
+        return False
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry TTL.  Keys are tuples whose first
+    element is a namespace (e.g. a table name) that can be invalidated as a
+    whole, locally and, with a channel, in every other worker process.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0,
+                 channel: Optional[FileInvalidationChannel] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.channel = channel
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}         # namespace -> int, bumped on invalidation
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_channel(self, namespace: str):
+        if self.channel and self.channel.changed(namespace):
+            self._drop(namespace)
+
+    def _drop(self, namespace: str):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def get_or_load(self, key: tuple, load: Callable[[], Any]) -> Any:
+        namespace = key[0]
+        self._check_channel(namespace)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generations.get(namespace, 0)
+
+        value = load()
+
+        with self._lock:
+            # an invalidation while we were loading means the value may be stale
+            if self._generations.get(namespace, 0) != generation:
+                return value
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, namespace: Hashable):
+        self._drop(namespace)
+        if self.channel:
+            self.channel.publish(namespace)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "shared_invalidation": self.channel is not None,
+            }
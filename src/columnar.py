@@ -0,0 +1,62 @@
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, List, NamedTuple
+from uuid import UUID
+
+from flask import current_app, has_app_context
+from flask.json.provider import DefaultJSONProvider
+
+COLUMNAR_MIMETYPE = "application/vnd.eshop.columnar+json"
+
+
+class Columnar(NamedTuple):
+    """Query result kept as the column names plus one tuple per row."""
+    columns: List[str]
+    rows: List[tuple]
+
+
+_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _http_date(value: date) -> str:
+    # the text of werkzeug.http.http_date (naive values are UTC) without its
+    # round trip through email.utils
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        clock = f"{value.hour:02d}:{value.minute:02d}:{value.second:02d}"
+    else:
+        clock = "00:00:00"
+    return f"{_DAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} {value.year:04d} {clock} GMT"
+
+
+# What Flask's default provider returns for these types, looked up by exact
+# type: one dict hit per value instead of its isinstance chain.  Only values
+# json can't encode itself ever reach it; anything else goes to the app's
+# provider, so columnar and jsonify output always agree.
+_ENCODERS = {
+    Decimal: str,
+    datetime: _http_date,
+    date: _http_date,
+    UUID: str,
+}
+
+
+def _default(value):
+    encode = _ENCODERS.get(type(value))
+    if encode is not None:
+        return encode(value)
+    return (current_app.json.default if has_app_context() else DefaultJSONProvider.default)(value)
+
+
+_encoder = json.JSONEncoder(separators=(",", ":"), default=_default)
+
+
+def dumps_columnar(result: Columnar, **extra: Any) -> str:
+    """
+    Serializes {"columns": [...], "rows": [[...], ...], **extra}.  Values are
+    written as jsonify writes them: Decimals as strings, dates as HTTP dates.
+    """
+    return _encoder.encode({"columns": result.columns, "rows": result.rows, **extra})
@@ -0,0 +1,110 @@
+import gzip
+import zlib
+from typing import Iterator, Optional
+
+from flask import current_app, request
+
+from cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip is offered
+    brotli = None
+
+
+def compression(enabled: bool = True, min_size: Optional[int] = None):
+    """
+    Per-route override of the app-wide settings, e.g. @compression(enabled=False)
+    on endpoints whose bodies are always tiny.  Goes above @versioned.
+    """
+    def decorator(view):
+        view.compression = {"enabled": enabled, "min_size": min_size}
+        return view
+    return decorator
+
+
+class Compressor:
+    """
+    Compresses JSON, NDJSON and text responses with the best encoding the
+    client accepts (br, then gzip).  Bodies smaller than min_size are sent
+    as they are; streamed bodies are compressed chunk by chunk and flushed
+    after every chunk so the client keeps receiving rows.  Compressed bodies
+    of responses with an ETag are cached, since the same ETag always means
+    the same bytes.
+    """
+
+    def __init__(self, app=None, min_size: int = 1024, level: int = 6,
+                 brotli_quality: int = 4, cache_entries: int = 256, cache_ttl: float = 300.0):
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.cache = TTLCache(max_entries=cache_entries, ttl=cache_ttl)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    def _route_options(self):
+        view = current_app.view_functions.get(request.endpoint)
+        options = getattr(view, "compression", {})
+        min_size = options.get("min_size")
+        return options.get("enabled", True), self.min_size if min_size is None else min_size
+
+    def _encoding(self) -> Optional[str]:
+        offered = ["br", "gzip"] if brotli else ["gzip"]
+        return request.accept_encodings.best_match(offered)
+
+    @staticmethod
+    def _compressible(mimetype: str) -> bool:
+        return mimetype.startswith("text/") or mimetype.endswith("json")
+
+    def _compress(self, data: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, self.level, mtime=0)
+
+    def _stream(self, chunks: Iterator[bytes], encoding: str) -> Iterator[bytes]:
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            for chunk in chunks:
+                yield compressor.process(chunk) + compressor.flush()
+            yield compressor.finish()
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            for chunk in chunks:
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield compressor.flush()
+
+    def after_request(self, response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or "Content-Encoding" in response.headers
+                or not self._compressible(response.mimetype)):
+            return response
+        enabled, min_size = self._route_options()
+        if not enabled:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = self._encoding()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._stream(response.iter_encoded(), encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            etag, _ = response.get_etag()
+            if etag:
+                body = self.cache.get_or_load(("compressed", etag, encoding), lambda: self._compress(data, encoding))
+                # the compressed bytes differ from the identity ones; If-None-Match
+                # still matches because it uses the weak comparison
+                response.set_etag(etag, weak=True)
+            else:
+                body = self._compress(data, encoding)
+            response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        return response
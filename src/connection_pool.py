@@ -0,0 +1,216 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of DB-API connections.
+
+    Connections are created lazily up to max_size, kept idle down to
+    min_size, checked when borrowed, recycled after max_age seconds and
+    rolled back when they are given back.  When every connection is in use
+    acquire() waits up to timeout seconds instead of opening a new one.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        max_age: float = 1800.0,
+        idle_timeout: float = 300.0,
+        ping_after: float = 30.0,
+        ping_sql: str = "SELECT 1",
+    ):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("invalid pool size (need 0 <= min_size <= max_size, max_size >= 1)")
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.ping_sql = ping_sql
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, created_at, returned_at), most recently returned on the right
+        self._born = {}       # id(conn) -> created_at for connections currently lent out
+        self._size = 0        # idle + in use + being created
+
+        self._created = 0
+        self._closed = 0
+        self._failed_checks = 0
+        self._acquired = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    # ------------------------------------------------------------------ internals
+
+    def _open(self):
+        try:
+            conn = self.factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created += 1
+        return conn, time.monotonic()
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._closed += 1
+            self._cond.notify()
+
+    def _healthy(self, conn, created_at: float, returned_at: float) -> bool:
+        now = time.monotonic()
+        if self.max_age and now - created_at > self.max_age:
+            return False
+        if getattr(conn, "closed", False):
+            return False
+        if now - returned_at < self.ping_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.ping_sql)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            with self._cond:
+                self._failed_checks += 1
+            return False
+
+    def _prune_idle(self):
+        # caller holds the lock; drops surplus connections idle for too long
+        now = time.monotonic()
+        stale = []
+        while len(self._idle) and self._size - len(stale) > self.min_size:
+            conn, created_at, returned_at = self._idle[0]
+            if now - returned_at < self.idle_timeout:
+                break
+            self._idle.popleft()
+            stale.append(conn)
+        return stale
+
+    # ------------------------------------------------------------------ public api
+
+    def prefill(self):
+        """Open connections until min_size are available."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn, created_at = self._open()
+            with self._cond:
+                self._idle.append((conn, created_at, created_at))
+                self._cond.notify()
+
+    def acquire(self, timeout: float = None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"no database connection available within {timeout}s")
+                    waited = True
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, created_at, returned_at = self._idle.pop()
+                    fresh = False
+                else:
+                    self._size += 1
+                    conn = None
+                    fresh = True
+
+            if fresh:
+                conn, created_at = self._open()
+            elif not self._healthy(conn, created_at, returned_at):
+                self._close(conn)
+                continue
+
+            elapsed = time.monotonic() - started
+            with self._cond:
+                self._born[id(conn)] = created_at
+                self._acquired += 1
+                if waited:
+                    self._waits += 1
+                self._wait_time += elapsed
+                self._max_wait_time = max(self._max_wait_time, elapsed)
+            return conn
+
+    def release(self, conn, discard: bool = False):
+        with self._cond:
+            created_at = self._born.pop(id(conn), None)
+        if created_at is None:
+            return
+
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        if not discard and self.max_age and time.monotonic() - created_at > self.max_age:
+            discard = True
+
+        if discard:
+            self._close(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, created_at, time.monotonic()))
+            stale = self._prune_idle()
+            self._cond.notify()
+        for c in stale:
+            self._close(c)
+
+    def close(self):
+        with self._cond:
+            idle = [c for c, _, _ in self._idle]
+            self._idle.clear()
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            in_use = len(self._born)
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": in_use,
+                "idle": len(self._idle),
+                "created": self._created,
+                "closed": self._closed,
+                "failed_checks": self._failed_checks,
+                "acquired": self._acquired,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "wait_time_total": round(self._wait_time, 6),
+                "wait_time_avg": round(self._wait_time / self._acquired, 6) if self._acquired else 0.0,
+                "wait_time_max": round(self._max_wait_time, 6),
+            }
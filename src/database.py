@@ -0,0 +1,26 @@
+from os import getenv
+from dotenv import load_dotenv
+import pyodbc
+
+load_dotenv()
+
+server_host = getenv("SERVER", "127.0.0.1")
+server_port = getenv("DB_SERVER_PORT", getenv("DB_PORT", "1433"))
+driver = getenv("ODBC_DRIVER", "ODBC Driver 18 for SQL Server")
+encrypt = getenv("ENCRYPT", "no")
+trust = getenv("TRUST", "no")
+
+server_and_port = f"{server_host}"
+
+CONN_STR = (
+    f"DRIVER={driver};"
+    f"SERVER={server_and_port};"
+    f"DATABASE={getenv('DATABASE')};"
+    f"UID={getenv('USER', 'admin')};"
+    f"PWD={getenv('PASSWORD')};"
+    f"Encrypt={encrypt};"
+    f"TrustServerCertificate={trust};"
+)
+
+def connect() -> pyodbc.Connection:
+    return pyodbc.connect(CONN_STR, autocommit=False)
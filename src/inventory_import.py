@@ -0,0 +1,95 @@
+"""
+Bulk inventory upsert from CSV.
+
+The CSV needs a header with warehouse_id, product_id and quantity_available;
+quantity_reserved is optional.  Rows are upserted on (warehouse_id, product_id)
+in chunks, see InventoryGateway.upsertMany.  Rows that are not valid numbers,
+have negative quantities or name an unknown warehouse/product are rejected.
+
+Also usable from the command line:
+
+    python inventory_import.py stock.csv [--chunk-size 50000]
+"""
+import argparse
+import csv
+import time
+from typing import Dict, Iterable, Optional
+
+from table_gateway import InventoryGateway
+
+REQUIRED_FIELDS = ["warehouse_id", "product_id", "quantity_available"]
+
+
+def parse_row(record: dict) -> Optional[tuple]:
+    try:
+        warehouse_id = int(record["warehouse_id"])
+        product_id = int(record["product_id"])
+        quantity_available = int(record["quantity_available"])
+        reserved = record.get("quantity_reserved")
+        quantity_reserved = int(reserved) if reserved not in (None, "") else None
+    except (KeyError, TypeError, ValueError):
+        return None
+    if quantity_available < 0 or (quantity_reserved is not None and quantity_reserved < 0):
+        return None
+    return warehouse_id, product_id, quantity_available, quantity_reserved
+
+
+def import_inventory(cursor, lines: Iterable[str], chunk_size: int = 50000) -> Dict[str, int]:
+    reader = csv.DictReader(lines)
+    missing = [f for f in REQUIRED_FIELDS if f not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError("CSV header is missing: " + ", ".join(missing))
+
+    gw = InventoryGateway(cursor)
+    counts = {"inserted": 0, "updated": 0, "rejected": 0}
+    chunk = {}
+
+    def flush():
+        inserted, updated, rejected = gw.upsertMany(list(chunk.values()))
+        counts["inserted"] += inserted
+        counts["updated"] += updated
+        counts["rejected"] += rejected
+        chunk.clear()
+
+    for record in reader:
+        row = parse_row(record)
+        if row is None:
+            counts["rejected"] += 1
+            continue
+        key = row[:2]
+        # MERGE cannot touch one target row twice, so a repeated key starts a new chunk
+        if key in chunk or len(chunk) >= chunk_size:
+            flush()
+        chunk[key] = row
+    flush()
+    return counts
+
+
+def main():
+    from database import connect
+
+    parser = argparse.ArgumentParser(description="Upsert inventory rows from a CSV file.")
+    parser.add_argument("file")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = connect()
+    try:
+        with open(args.file, newline="", encoding="utf-8") as f:
+            counts = import_inventory(db.cursor(), f, args.chunk_size)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(f"inserted: {counts['inserted']}, updated: {counts['updated']}, rejected: {counts['rejected']}")
+    print(f"{total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
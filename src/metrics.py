@@ -0,0 +1,193 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Response, g, request
+
+# seconds; the Prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """One metric family; samples are keyed by their label values, in labelnames order."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items(), key=lambda item: tuple(map(str, item[0])))
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def add(self, amount: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def set(self, value: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues):
+        # per label set: [count per bucket..., +Inf count, sum]
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._values.get(labelvalues)
+            if sample is None:
+                sample = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            sample[i] += 1
+            sample[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(((k, list(v)) for k, v in self._values.items()), key=lambda item: tuple(map(str, item[0])))
+        lines = self.header()
+        for labelvalues, sample in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), sample):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {_number(sample[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    The metrics of one process.  Collectors are called at scrape time and
+    return (name, kind, help, {label values: value}) for numbers that are
+    kept elsewhere, like the pool statistics.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def add(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.add(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.add(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, fn: Callable[[], Iterable[Tuple[str, str, str, Sequence[str], Dict[tuple, float]]]]):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collect in self._collectors:
+            for name, kind, help, labelnames, values in collect():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(labelnames, k)} {_number(v)}" for k, v in values.items()]
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    """
+    Request counts, latency histograms and in-flight requests per route
+    template, served on /metrics in the Prometheus text format.  Create it
+    before other teardown_request handlers so its timing includes them
+    (Flask runs teardown handlers in reverse order).
+    """
+
+    def __init__(self, app=None, registry: Optional[Registry] = None, path: str = "/metrics", prefix: str = "eshop"):
+        self.registry = registry or Registry()
+        self.path = path
+        self.requests = self.registry.counter(
+            f"{prefix}_http_requests_total", "HTTP requests by route template, method and status.",
+            ("method", "route", "status"))
+        self.latency = self.registry.histogram(
+            f"{prefix}_http_request_duration_seconds", "Time from the first request hook to teardown.",
+            ("method", "route"))
+        self.in_flight = self.registry.gauge(f"{prefix}_http_requests_in_flight", "Requests being handled.")
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule(self.path, "metrics", self.expose, methods=["GET"])
+
+    @staticmethod
+    def route() -> str:
+        return request.url_rule.rule if request.url_rule is not None else "[unmatched]"
+
+    def before_request(self):
+        g.metrics_started = time.perf_counter()
+        self.in_flight.add(1)
+
+    def after_request(self, response):
+        g.metrics_status = response.status_code
+        return response
+
+    def teardown_request(self, exception):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        self.in_flight.add(-1)
+        route = self.route()
+        status = g.pop("metrics_status", 500 if exception else 200)
+        self.requests.inc(request.method, route, status)
+        self.latency.observe(time.perf_counter() - started, request.method, route)
+
+    def expose(self):
+        return Response(self.registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,44 @@
+"""
+Compares the maintained sales_summary table (v_sales_summary) with a fresh
+aggregation of v_sales_report and prints every order where they differ.
+
+    python sales_summary_check.py            # exit code 1 when they differ
+    python sales_summary_check.py --repair   # rebuild sales_summary if they differ
+"""
+import argparse
+import sys
+
+from table_gateway import SalesReportGateway
+
+
+def main():
+    from database import connect
+
+    parser = argparse.ArgumentParser(description="Check sales_summary against v_sales_report.")
+    parser.add_argument("--repair", action="store_true", help="rebuild sales_summary when drift is found")
+    args = parser.parse_args()
+
+    db = connect()
+    try:
+        gw = SalesReportGateway(db.cursor())
+        drift = gw.selectSummaryDrift()
+        for row in drift:
+            print(row)
+        if not drift:
+            print("sales_summary is consistent with v_sales_report")
+            return 0
+
+        print(f"{len(drift)} differing rows")
+        if not args.repair:
+            return 1
+        gw.rebuildSummary()
+        db.commit()
+        print("sales_summary rebuilt")
+        return 0
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Production entry point: serves the API with waitress in API_WORKERS
+processes of API_THREADS threads each, all accepting on one shared socket.
+
+    python serve.py                                   # server:app, settings from .env
+    python serve.py --app ../server_emulator_no_db/memory_server.py:app --workers 4
+
+With --mode async (API_MODE=async) each worker runs uvicorn instead: the
+event loop holds the connections and requests run on two bounded thread
+pools, ASYNC_REPORT_THREADS for /report* and ASYNC_OLTP_THREADS for the rest
+(see asgi.ExecutorBridge).
+
+The supervisor restarts workers that die.  On POSIX, SIGHUP reloads: .env
+is read again, a new set of workers is started and the old ones finish their
+requests before they exit.  SIGTERM/SIGINT stop the same graceful way.
+"""
+import argparse
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from dotenv import load_dotenv
+
+
+def settings(args) -> dict:
+    load_dotenv(override=True)
+    mode = args.mode or os.getenv("API_MODE", "threaded")
+    if importlib.util.find_spec("uvicorn" if mode == "async" else "waitress") is None:
+        raise SystemExit(f"API_MODE={mode} needs {'uvicorn' if mode == 'async' else 'waitress'} (pip install -r requirements.txt)")
+    if mode == "async":
+        threads = int(os.getenv("ASYNC_OLTP_THREADS", 16)) + int(os.getenv("ASYNC_REPORT_THREADS", 4))
+    else:
+        threads = args.threads or int(os.getenv("API_THREADS", 8))
+    workers = args.workers or int(os.getenv("API_WORKERS", 1))
+    if workers > 1:
+        share_between_workers(args.port)
+    return {
+        "app": args.app or os.getenv("API_APP", "server:app"),
+        "mode": mode,
+        "workers": workers,
+        "threads": threads,
+        "graceful_timeout": float(os.getenv("API_GRACEFUL_TIMEOUT", 30)),
+        # one connection per thread is all a worker can use at once
+        "pool_max": int(os.getenv("DB_POOL_MAX") or threads),
+    }
+
+
+def share_between_workers(port: int):
+    """
+    Logins and cache invalidations only reach every worker through the
+    SQLite token store and the marker directory; without them each worker
+    keeps its own, and /logout or a price change misses the others.  Unset
+    paths default to API_RUNTIME_DIR, inherited by the spawned workers.
+    """
+    runtime = os.getenv("API_RUNTIME_DIR") or os.path.join(tempfile.gettempdir(), f"eshop-{port}")
+    for name, default in (("TOKEN_STORE_PATH", "tokens.sqlite3"), ("CACHE_INVALIDATION_DIR", "invalidation")):
+        if not os.getenv(name):
+            os.makedirs(runtime, mode=0o700, exist_ok=True)
+            os.environ[name] = os.path.join(runtime, default)
+            print(f"{name} not set, sharing {os.environ[name]} between workers", flush=True)
+
+
+def load_app(spec: str):
+    """Returns (module, wsgi app) for module:attribute or path/to/file.py:attribute."""
+    module, _, attribute = spec.partition(":")
+    if module.endswith(".py"):
+        path = os.path.abspath(module)
+        sys.path.insert(0, os.path.dirname(path))
+        module = os.path.splitext(os.path.basename(path))[0]
+    module = importlib.import_module(module)
+    return module, getattr(module, attribute or "app")
+
+
+def run_worker(sock: socket.socket, config: dict):
+    os.environ["DB_POOL_MAX"] = str(config["pool_max"])
+    os.environ["DB_POOL_MIN"] = str(min(int(os.getenv("DB_POOL_MIN", 1)), config["pool_max"]))
+    module, app = load_app(config["app"])
+    pool = getattr(module, "pool", None)
+    if pool is not None:
+        try:
+            pool.prefill()
+        except Exception as e:
+            print(f"Could not prefill connection pool: {e}", flush=True)
+
+    watch_parent()
+    if config["mode"] == "async":
+        serve_async(sock, app, config)
+    else:
+        serve_threaded(sock, app, config)
+    if pool is not None:
+        pool.close()
+
+
+def watch_parent():
+    # a killed supervisor can't stop its workers; don't linger holding the socket
+    def watch(parent: int):
+        while os.getppid() == parent:
+            time.sleep(1)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    threading.Thread(target=watch, args=(os.getppid(),), daemon=True).start()
+
+
+def serve_async(sock: socket.socket, app, config: dict):
+    import uvicorn
+    from asgi import ExecutorBridge
+
+    bridge = ExecutorBridge(
+        app,
+        oltp_threads=int(os.getenv("ASYNC_OLTP_THREADS", 16)),
+        report_threads=int(os.getenv("ASYNC_REPORT_THREADS", 4)),
+        oltp_queue=int(os.getenv("ASYNC_OLTP_QUEUE", 256)),
+        report_queue=int(os.getenv("ASYNC_REPORT_QUEUE", 16)),
+    )
+    # uvicorn handles SIGTERM/SIGINT itself: stop accepting, finish open requests
+    server = uvicorn.Server(uvicorn.Config(
+        bridge, lifespan="on", log_level="warning", access_log=False,
+        timeout_graceful_shutdown=int(config["graceful_timeout"]),
+    ))
+    server.run(sockets=[sock])
+
+
+def serve_threaded(sock: socket.socket, app, config: dict):
+    from waitress.server import create_server
+
+    server = create_server(app, sockets=[sock], threads=config["threads"], ident="eshop")
+
+    stopping = threading.Event()
+    drained = threading.Event()
+
+    def drain():
+        # give open requests graceful_timeout seconds, closing idle keep-alive
+        # connections as they come free, then signal ourselves to stop the loop
+        deadline = time.monotonic() + config["graceful_timeout"]
+        while time.monotonic() < deadline:
+            busy = False
+            for channel in list(server.active_channels.values()):
+                if channel.requests:
+                    busy = True
+                else:
+                    channel.will_close = True
+            server.pull_trigger()
+            if not busy:
+                break
+            time.sleep(0.1)
+        drained.set()
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def stop(signum, frame):
+        if drained.is_set():
+            raise SystemExit(0)
+        if stopping.is_set():
+            return
+        stopping.set()
+        # stop accepting; the other workers keep taking connections from the
+        # shared socket.  Closing it here would break the select() in progress.
+        server.accepting = False
+        threading.Thread(target=drain, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    server.run()
+
+
+class Supervisor:
+    def __init__(self, args, sock: socket.socket):
+        self.args = args
+        self.sock = sock
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = []
+        self.reload_requested = False
+        self.stop_requested = False
+
+    def spawn(self, config: dict):
+        process = self.context.Process(target=run_worker, args=(self.sock, config), daemon=False)
+        process.start()
+        return process
+
+    def start(self):
+        self.config = settings(self.args)
+        self.workers = [self.spawn(self.config) for _ in range(self.config["workers"])]
+        print(
+            f"serving {self.config['app']} ({self.config['mode']}) on {self.args.host}:{self.args.port} with "
+            f"{self.config['workers']} worker(s) x {self.config['threads']} thread(s), "
+            f"up to {self.config['workers'] * self.config['pool_max']} database connections",
+            flush=True,
+        )
+
+    def stop_workers(self, workers, wait: bool):
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+        if wait:
+            for process in workers:
+                process.join(self.config["graceful_timeout"] + 5)
+                if process.is_alive():
+                    process.kill()
+
+    def reload(self):
+        # new workers accept as soon as they are up; the old ones drain meanwhile
+        old = self.workers
+        self.start()
+        self.stop_workers(old, wait=False)
+        self.retired += old
+
+    def run(self):
+        self.retired = []
+        self.start()
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda *_: setattr(self, "reload_requested", True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, "stop_requested", True))
+        try:
+            while not self.stop_requested:
+                time.sleep(0.5)
+                if self.reload_requested:
+                    self.reload_requested = False
+                    self.reload()
+                for process in [p for p in self.retired if not p.is_alive()]:
+                    process.join()
+                    self.retired.remove(process)
+                for i, process in enumerate(self.workers):
+                    if not process.is_alive():
+                        print(f"worker {process.pid} exited with {process.exitcode}, restarting", flush=True)
+                        self.workers[i] = self.spawn(self.config)
+        except KeyboardInterrupt:
+            pass
+        self.stop_workers(self.workers + self.retired, wait=True)
+
+
+def main():
+    multiprocessing.freeze_support()
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Runs the API under waitress with several worker processes.")
+    parser.add_argument("--app", help="module:attribute or path/to/file.py:attribute (API_APP, default server:app)")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_SERVER_PORT", 5000)))
+    parser.add_argument("--workers", type=int, help="worker processes (API_WORKERS, default 1)")
+    parser.add_argument("--threads", type=int, help="threads per worker (API_THREADS, default 8)")
+    parser.add_argument("--mode", choices=["threaded", "async"], help="API_MODE, default threaded")
+    args = parser.parse_args()
+
+    sock = socket.create_server((args.host, args.port), backlog=2048)
+    sock.set_inheritable(True)
+    Supervisor(args, sock).run()
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,28 @@
-from flask import Flask, abort, jsonify, request, g
+from flask import Flask, Response, abort, jsonify, request, g
 from os import getenv
+from datetime import datetime
+from functools import wraps
+import csv
+import hashlib
+import io
+import time
 from dotenv import load_dotenv
 import pyodbc
-import secrets
 from flask_cors import CORS
 
+from cache import FileInvalidationChannel, TTLCache
+from columnar import COLUMNAR_MIMETYPE, Columnar, dumps_columnar
+from compression import Compressor, compression
+from connection_pool import ConnectionPool, PoolTimeout
+from database import connect
+from inventory_import import import_inventory
+from metrics import RequestMetrics
+from statement_stats import StatementStats
+from token_store import MemoryTokenStore, SQLiteTokenStore
 from table_gateway import (
+    TimedCursor,
+    observe_gateways,
+    update_templates,
     OrdersGateway,
     OrderItemsGateway,
     ProductsGateway,
@@ -13,53 +30,301 @@ from table_gateway import (
     InventoryGateway,
     PaymentsGateway,
     SalesReportGateway, 
-    StockReportGateway
+    StockReportGateway,
+    TableVersionsGateway
 )
 
-loggedUsers = []
-
 load_dotenv()
 
-server_host = getenv("SERVER", "127.0.0.1")
-server_port = getenv("DB_SERVER_PORT", getenv("DB_PORT", "1433"))
-driver = getenv("ODBC_DRIVER", "ODBC Driver 18 for SQL Server")
-encrypt = getenv("ENCRYPT", "no")
-trust = getenv("TRUST", "no")
-
-server_and_port = f"{server_host}"
-
-CONN_STR = (
-    f"DRIVER={driver};"
-    f"SERVER={server_and_port};"
-    f"DATABASE={getenv('DATABASE')};"
-    f"UID={getenv('USER', 'admin')};"
-    f"PWD={getenv('PASSWORD')};"
-    f"Encrypt={encrypt};"
-    f"TrustServerCertificate={trust};"
+pool = ConnectionPool(
+    connect,
+    min_size=int(getenv("DB_POOL_MIN", 1)),
+    max_size=int(getenv("DB_POOL_MAX", 10)),
+    timeout=float(getenv("DB_POOL_TIMEOUT", 10)),
+    max_age=float(getenv("DB_POOL_MAX_AGE", 1800)),
+    idle_timeout=float(getenv("DB_POOL_IDLE_TIMEOUT", 300)),
+    ping_after=float(getenv("DB_POOL_PING_AFTER", 30)),
+)
+
+# products and warehouses are small and read-mostly; see invalidate_after_commit
+catalog_cache = TTLCache(
+    max_entries=int(getenv("CACHE_MAX_ENTRIES", 1024)),
+    ttl=float(getenv("CACHE_TTL", 60)),
+    channel=FileInvalidationChannel(getenv("CACHE_INVALIDATION_DIR")) if getenv("CACHE_INVALIDATION_DIR") else None,
+)
+
+# the table versions behind the ETags.  Writes that bypass the API (imports,
+# repairs, manual SQL) can't invalidate anything, so a version is only
+# trusted for ETAG_VERSION_TTL seconds; 0 reads it on every request
+version_cache = TTLCache(max_entries=64, ttl=float(getenv("ETAG_VERSION_TTL", 1)))
+
+# TOKEN_STORE_PATH shares logins between worker processes through a SQLite file
+token_store_options = dict(
+    ttl=float(getenv("TOKEN_TTL", 28800)),
+    max_tokens=int(getenv("TOKEN_MAX", 10000)),
+    purge_interval=float(getenv("TOKEN_PURGE_INTERVAL", 60)),
+)
+tokens = (
+    SQLiteTokenStore(getenv("TOKEN_STORE_PATH"), **token_store_options) if getenv("TOKEN_STORE_PATH")
+    else MemoryTokenStore(**token_store_options)
+)
+
+statements = StatementStats(
+    slow_ms=float(getenv("SLOW_QUERY_MS", 500)),
+    slow_log=getenv("SLOW_QUERY_LOG"),
+    sample_after=int(getenv("SQL_STATS_SAMPLE_AFTER", 10000)),
+    sample_every=int(getenv("SQL_STATS_SAMPLE_EVERY", 10)),
+    max_statements=int(getenv("SQL_STATS_MAX", 5000)),
 )
 
+DEFAULT_PAGE_SIZE = int(getenv("PAGE_SIZE_DEFAULT", 100))
+MAX_PAGE_SIZE = int(getenv("PAGE_SIZE_MAX", 1000))
+EXPORT_BATCH_SIZE = int(getenv("EXPORT_BATCH_SIZE", 1000))
+MAX_ORDER_BATCH = int(getenv("ORDER_BATCH_MAX", 10000))
+INVENTORY_IMPORT_CHUNK = int(getenv("INVENTORY_IMPORT_CHUNK", 50000))
+
 app = Flask(__name__)
 
-cors = CORS(app, resources={r"/*": {"origins": "*"}})
+cors = CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["ETag"])
+
+compressor = Compressor(
+    app,
+    min_size=int(getenv("COMPRESS_MIN_SIZE", 1024)),
+    level=int(getenv("COMPRESS_LEVEL", 6)),
+    brotli_quality=int(getenv("COMPRESS_BROTLI_QUALITY", 4)),
+    cache_entries=int(getenv("COMPRESS_CACHE_ENTRIES", 256)),
+)
+
+# created before teardown_request below, so request timings include the commit
+metrics = RequestMetrics(app)
+db_acquire_seconds = metrics.registry.histogram(
+    "eshop_db_acquire_seconds", "Time to borrow a connection from the pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0))
+db_transactions = metrics.registry.counter(
+    "eshop_db_transactions_total", "Request transactions by outcome (commit, rollback, error).", ("outcome",))
+gateway_seconds = metrics.registry.histogram(
+    "eshop_gateway_seconds", "Gateway method time; phase sql is execute(), python is fetching and converting rows.",
+    ("method", "phase"))
+gateway_rows = metrics.registry.counter("eshop_gateway_rows_total", "Rows fetched by gateway method.", ("method",))
+
+def observe_gateway(name, sql_seconds, python_seconds, rows):
+    gateway_seconds.observe(sql_seconds, name, "sql")
+    gateway_seconds.observe(python_seconds, name, "python")
+    if rows:
+        gateway_rows.inc(name, amount=rows)
+
+observe_gateways(observe_gateway)
+
+@metrics.registry.collector
+def pool_metrics():
+    stats = pool.stats()
+    yield "eshop_db_pool_connections", "gauge", "Pool connections by state.", ("state",), {
+        ("in_use",): stats["in_use"], ("idle",): stats["idle"], ("max",): stats["max_size"]}
+    yield "eshop_db_pool_timeouts_total", "counter", "Requests that got no connection in time.", (), {(): stats["timeouts"]}
+    yield "eshop_db_pool_connections_created_total", "counter", "Connections opened.", (), {(): stats["created"]}
+
+@metrics.registry.collector
+def statement_metrics():
+    yield "eshop_db_slow_queries_total", "counter", "Statements slower than SLOW_QUERY_MS.", (), {
+        (): statements.slow_count}
+    lookups = {}
+    for table, stats in update_templates.stats().items():
+        lookups[(table, "hit")] = stats["hits"]
+        lookups[(table, "miss")] = stats["misses"]
+    yield "eshop_db_update_templates_total", "counter", "updateById statement lookups by table and cache result.", (
+        "table", "result"), lookups
+
+def acquire_db():
+    started = time.perf_counter()
+    try:
+        return pool.acquire()
+    except PoolTimeout as e:
+        abort(503, str(e))
+    finally:
+        db_acquire_seconds.observe(time.perf_counter() - started)
 
 def get_db():
     if "db" not in g:
-        g.db = pyodbc.connect(CONN_STR, autocommit=False)
+        g.db = acquire_db()
     return g.db
 
 def get_cursor():
-    return get_db().cursor()
+    cursor = TimedCursor(get_db().cursor(), statements, RequestMetrics.route())
+    g.setdefault("cursors", []).append(cursor)
+    return cursor
 
 @app.teardown_request
 def teardown_request(exception):
+    # statements whose result was not read to the end
+    for cursor in g.pop("cursors", ()):
+        cursor.finish()
     db = g.pop("db", None)
     if not db:
         return
-    if exception:
-        db.rollback()
+    broken = False
+    try:
+        if exception:
+            db.rollback()
+            db_transactions.inc("rollback")
+        else:
+            db.commit()
+            db_transactions.inc("commit")
+            for namespace in g.pop("invalidate", ()):
+                catalog_cache.invalidate(namespace)
+                version_cache.invalidate(namespace)
+    except pyodbc.Error:
+        broken = True
+        db_transactions.inc("error")
+        raise
+    finally:
+        pool.release(db, discard=broken)
+
+def invalidate_after_commit(namespace):
+    # dropping cached rows before the write commits would let a concurrent
+    # read cache the old version again
+    g.setdefault("invalidate", set()).add(namespace)
+
+def table_version(table):
+    # MAX(rv) and COUNT_BIG(*) are one seek each on ix_<table>_rv
+    return version_cache.get_or_load(
+        (table, "version"),
+        lambda: TableVersionsGateway(get_cursor()).selectVersion(table)
+    )
+
+def versioned(*tables):
+    """
+    Strong ETag from the versions of the tables a response is built from.
+    A matching If-None-Match gets a 304 without running the view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = {table: table_version(table) for table in tables}
+            key = f"{sorted(versions.items())}|{request.full_path}|{request.headers.get('Accept', '')}"
+            etag = hashlib.sha1(key.encode()).hexdigest()
+            # weak comparison: compressed responses carry W/ etags
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+            response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
+
+def page_args():
+    try:
+        after_id = int(request.args.get("after_id", 0))
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        abort(400, "after_id and limit must be integers")
+    if limit < 1:
+        abort(400, "limit must be positive")
+    return after_id, min(limit, MAX_PAGE_SIZE)
+
+def wants_columnar():
+    """
+    ?format=columnar or an Accept header preferring COLUMNAR_MIMETYPE selects
+    {"columns": [...], "rows": [[...]]} instead of one object per row.
+    """
+    fmt = request.args.get("format")
+    if fmt is not None:
+        if fmt not in ("json", "columnar"):
+            abort(400, "format must be one of: json, columnar")
+        return fmt == "columnar"
+    return request.accept_mimetypes.best_match(["application/json", COLUMNAR_MIMETYPE]) == COLUMNAR_MIMETYPE
+
+def rows_response(rows, **extra):
+    if isinstance(rows, Columnar):
+        response = app.response_class(dumps_columnar(rows, **extra), mimetype=COLUMNAR_MIMETYPE)
+    elif extra:
+        response = jsonify({"items": rows, **extra})
     else:
-        db.commit()
-    db.close()
+        response = jsonify(rows)
+    response.vary.add("Accept")
+    return response
+
+def cached_page(namespace, gateway_cls):
+    after_id, limit = page_args()
+    columnar = wants_columnar()
+    return catalog_cache.get_or_load(
+        (namespace, "page", after_id, limit, columnar),
+        lambda: gateway_cls(get_cursor()).selectPage(after_id, limit, columnar)
+    )
+
+def page_response(page):
+    items, next_cursor = page
+    return rows_response(items, next_cursor=next_cursor)
+
+def ndjson_chunks(columns, batches):
+    for rows in batches:
+        yield "".join(app.json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+
+def csv_chunks(columns, batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    yield buf.getvalue()
+    for rows in batches:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(rows)
+        yield buf.getvalue()
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_chunks, "application/x-ndjson"),
+    "csv": (csv_chunks, "text/csv"),
+}
+
+def export_format():
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        abort(400, "format must be one of: " + ", ".join(EXPORT_FORMATS))
+    return fmt
+
+def export_response(name, fmt, gateway_cls):
+    # The request connection is released when the view returns, long before
+    # a streamed body is sent, so exports borrow their own connection and
+    # hand it back only once the response is closed.
+    chunks, mimetype = EXPORT_FORMATS[fmt]
+    db = acquire_db()
+    try:
+        cursor = TimedCursor(db.cursor(), statements, RequestMetrics.route())
+        stream = gateway_cls(cursor).streamAll(EXPORT_BATCH_SIZE)
+    except Exception:
+        pool.release(db)
+        raise
+    response = Response(chunks(*stream), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{name}.{fmt}"'
+    response.call_on_close(lambda: (cursor.finish(), pool.release(db)))
+    return response
+
+@app.route("/pool/stats", methods=["GET"])
+@compression(enabled=False)
+def pool_stats():
+    return jsonify(pool.stats())
+
+@app.route("/sql/stats", methods=["GET"])
+@compression(enabled=False)
+def sql_stats():
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        abort(400, "limit must be an integer")
+    order_by = request.args.get("order_by", "total_ms")
+    if order_by not in StatementStats.ORDER_BY:
+        abort(400, "order_by must be one of: " + ", ".join(StatementStats.ORDER_BY))
+    return jsonify(dict(statements.stats(limit, order_by), update_templates=update_templates.stats()))
+
+@app.route("/sql/stats", methods=["DELETE"])
+def reset_sql_stats():
+    statements.reset()
+    return "", 204
+
+@app.route("/cache/stats", methods=["GET"])
+@compression(enabled=False)
+def cache_stats():
+    return jsonify(dict(catalog_cache.stats(), etag_versions=version_cache.stats()))
     
 # =================================================== orders
 
@@ -73,8 +338,25 @@ def create_order():
         data["billing_address"],
         data["currency"],
     )
+    invalidate_after_commit("orders")
     return jsonify({"status": "created"}), 201
 
+@app.route("/orders/batch", methods=["POST"])
+def create_orders_batch():
+    data = request.json
+    if not isinstance(data, list) or not data:
+        abort(400, "Expected a non-empty JSON array of orders")
+    if len(data) > MAX_ORDER_BATCH:
+        abort(400, f"At most {MAX_ORDER_BATCH} orders per batch")
+    required_fields = ["user_id", "shipping_address", "billing_address", "currency"]
+    for i, order in enumerate(data):
+        if not isinstance(order, dict) or not all(field in order for field in required_fields):
+            abort(400, f"Order {i}: missing required fields: user_id, shipping_address, billing_address, currency")
+    gw = OrdersGateway(get_cursor())
+    order_ids = gw.insertMany(data)
+    invalidate_after_commit("orders")
+    return jsonify({"status": "created", "order_ids": order_ids}), 201
+
 @app.route("/orders/<int:order_id>", methods=["GET"])
 def get_order(order_id):
     gw = OrdersGateway(get_cursor())
@@ -86,19 +368,25 @@ def get_order(order_id):
 @app.route("/orders/<int:order_id>", methods=["PUT"])
 def update_order(order_id):
     gw = OrdersGateway(get_cursor())
-    gw.updateById(order_id, request.json)
+    try:
+        gw.updateById(order_id, request.json)
+    except ValueError as e:
+        abort(400, str(e))
+    invalidate_after_commit("orders")
     return jsonify({"status": "updated"})
 
 @app.route("/orders/<int:order_id>", methods=["DELETE"])
 def delete_order(order_id):
     gw = OrdersGateway(get_cursor())
     gw.deleteById(order_id)
+    invalidate_after_commit("orders")
     return jsonify({"status": "deleted"})
 
 @app.route("/orders/all", methods=["GET"])
+@versioned("orders")
 def get_all_orders():
     gw = OrdersGateway(get_cursor())
-    return jsonify(gw.selectAll())
+    return page_response(gw.selectPage(*page_args(), wants_columnar()))
 
 # ============================================================================== order items
 
@@ -106,16 +394,35 @@ def get_all_orders():
 def add_item_to_order(order_id: int):
     data = request.json
     gw = OrderItemsGateway(get_cursor())
-    return jsonify(gw.addItem(order_id, data["product_id"], data["quantity"]))
+    result = gw.addItem(order_id, data["product_id"], data["quantity"])
+    invalidate_after_commit("order_items")
+    invalidate_after_commit("orders")
+    return jsonify(result)
+@app.route("/orders/<int:order_id>/items/bulk", methods=["POST"])
+def add_items_to_order(order_id: int):
+    data = request.json
+    if not isinstance(data, list) or not data:
+        abort(400, "Expected a non-empty JSON array of items")
+    for i, item in enumerate(data):
+        if not isinstance(item, dict) or "product_id" not in item or "quantity" not in item:
+            abort(400, f"Item {i}: missing required fields: product_id, quantity")
+    gw = OrderItemsGateway(get_cursor())
+    gw.addItems(order_id, data)
+    invalidate_after_commit("order_items")
+    invalidate_after_commit("orders")
+    return jsonify({"status": "created", "count": len(data)}), 201
 @app.route("/orders/<int:order_id>/items", methods=["DELETE"])
 def remove_item_from_order(order_id: int):
     data = request.json
     gw = OrderItemsGateway(get_cursor())
-    return jsonify(gw.removeItemByNameAndOrder(data["name"], order_id))
+    result = gw.removeItemByNameAndOrder(data["name"], order_id)
+    invalidate_after_commit("order_items")
+    return jsonify(result)
 @app.route("/orders/<int:order_id>/items", methods=["GET"])
+@versioned("order_items")
 def get_all_items_from_order(order_id: int):
     gw = OrderItemsGateway(get_cursor())
-    return jsonify(gw.selectByOrder(order_id))
+    return page_response(gw.selectByOrderPage(order_id, *page_args(), wants_columnar()))
 
 
 # ============================================================================== products
@@ -125,12 +432,15 @@ def create_product():
     data = request.json
     gw = ProductsGateway(get_cursor())
     gw.insert(data["product_name"], data["unit_price"], data["tax_rate"])
+    invalidate_after_commit("products")
     return jsonify({"status": "created"}), 201
 
 @app.route("/products/<int:product_id>", methods=["GET"])
 def get_product(product_id):
-    gw = ProductsGateway(get_cursor())
-    product = gw.selectById(product_id)
+    product = catalog_cache.get_or_load(
+        ("products", product_id),
+        lambda: ProductsGateway(get_cursor()).selectById(product_id)
+    )
     if not product:
         abort(404)
     return jsonify(product)
@@ -138,24 +448,29 @@ def get_product(product_id):
 @app.route("/products/<int:product_id>", methods=["PUT"])
 def update_product(product_id):
     gw = ProductsGateway(get_cursor())
-    gw.updateById(product_id, request.json)
+    try:
+        gw.updateById(product_id, request.json)
+    except ValueError as e:
+        abort(400, str(e))
+    invalidate_after_commit("products")
     return jsonify({"status": "updated"})
 
 @app.route("/products/<int:product_id>", methods=["DELETE"])
 def delete_product(product_id):
     gw = ProductsGateway(get_cursor())
     gw.deleteById(product_id)
+    invalidate_after_commit("products")
     return jsonify({"status": "deleted"})
 
 @app.route("/products", methods=["GET"])
+@versioned("products")
 def list_products():
-    gw = ProductsGateway(get_cursor())
-    return jsonify(gw.selectAll())
+    return page_response(cached_page("products", ProductsGateway))
 
 @app.route("/products/all", methods=["GET"])
+@versioned("products")
 def get_all_products():
-    gw = ProductsGateway(get_cursor())
-    return jsonify(gw.selectAll())
+    return page_response(cached_page("products", ProductsGateway))
 
 # ============================================================================== warehouses
 
@@ -164,12 +479,15 @@ def create_warehouse():
     data = request.json
     gw = WarehouseGateway(get_cursor())
     gw.insert(data["warehouse_name"], data["location_code"], data["is_active"])
+    invalidate_after_commit("warehouse")
     return jsonify({"status": "created"}), 201
 
 @app.route("/warehouses/<int:warehouse_id>", methods=["GET"])
 def get_warehouse(warehouse_id):
-    gw = WarehouseGateway(get_cursor())
-    wh = gw.selectById(warehouse_id)
+    wh = catalog_cache.get_or_load(
+        ("warehouse", warehouse_id),
+        lambda: WarehouseGateway(get_cursor()).selectById(warehouse_id)
+    )
     if not wh:
         abort(404)
     return jsonify(wh)
@@ -177,24 +495,29 @@ def get_warehouse(warehouse_id):
 @app.route("/warehouses/<int:warehouse_id>", methods=["PUT"])
 def update_warehouse(warehouse_id):
     gw = WarehouseGateway(get_cursor())
-    gw.updateById(warehouse_id, request.json)
+    try:
+        gw.updateById(warehouse_id, request.json)
+    except ValueError as e:
+        abort(400, str(e))
+    invalidate_after_commit("warehouse")
     return jsonify({"status": "updated"})
 
 @app.route("/warehouses/<int:warehouse_id>", methods=["DELETE"])
 def delete_warehouse(warehouse_id):
     gw = WarehouseGateway(get_cursor())
     gw.deleteById(warehouse_id)
+    invalidate_after_commit("warehouse")
     return jsonify({"status": "deleted"})
 
 @app.route("/warehouses", methods=["GET"])
+@versioned("warehouse")
 def list_warehouses():
-    gw = WarehouseGateway(get_cursor())
-    return jsonify(gw.selectAll())
+    return page_response(cached_page("warehouse", WarehouseGateway))
 
 @app.route("/warehouses/all", methods=["GET"])
+@versioned("warehouse")
 def get_all_warehouses():
-    gw = WarehouseGateway(get_cursor())
-    return jsonify(gw.selectAll())
+    return page_response(cached_page("warehouse", WarehouseGateway))
 
 # ====================================================================== inventory
 
@@ -212,8 +535,20 @@ def create_inventory():
         quantity_available=data["quantity_available"],
         quantity_reserved=data.get("quantity_reserved", 0)
     )
+    invalidate_after_commit("inventory")
     return jsonify({"status": "created"}), 201
 
+@app.route("/inventory/import", methods=["POST"])
+def import_inventory_csv():
+    # the CSV body is read line by line, never held in memory as a whole
+    lines = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+    try:
+        counts = import_inventory(get_cursor(), lines, INVENTORY_IMPORT_CHUNK)
+    except ValueError as e:
+        abort(400, str(e))
+    invalidate_after_commit("inventory")
+    return jsonify(counts)
+
 @app.route("/inventory/<int:inventory_id>", methods=["GET"])
 def get_inventory(inventory_id):
     gw = InventoryGateway(get_cursor())
@@ -228,29 +563,37 @@ def update_inventory(inventory_id):
     if not data:
         abort(400, "No data provided")
     gw = InventoryGateway(get_cursor())
-    gw.updateById(inventory_id, data)
+    try:
+        gw.updateById(inventory_id, data)
+    except ValueError as e:
+        abort(400, str(e))
+    invalidate_after_commit("inventory")
     return jsonify({"status": "updated"})
 
 @app.route("/inventory/<int:inventory_id>", methods=["DELETE"])
 def delete_inventory(inventory_id):
     gw = InventoryGateway(get_cursor())
     gw.deleteById(inventory_id)
+    invalidate_after_commit("inventory")
     return jsonify({"status": "deleted"})
 
 @app.route("/inventory/all", methods=["GET"])
+@versioned("inventory")
 def list_inventory():
     gw = InventoryGateway(get_cursor())
-    return jsonify(gw.selectAll())
+    return page_response(gw.selectPage(*page_args(), wants_columnar()))
 
 @app.route("/inventory/warehouse/<int:warehouse_id>", methods=["GET"])
+@versioned("inventory")
 def list_inventory_by_warehouse(warehouse_id):
     gw = InventoryGateway(get_cursor())
-    return jsonify(gw.selectByWarehouse(warehouse_id))
+    return page_response(gw.selectByWarehousePage(warehouse_id, *page_args(), wants_columnar()))
 
 @app.route("/inventory/product/<int:product_id>", methods=["GET"])
+@versioned("inventory")
 def list_inventory_by_product(product_id):
     gw = InventoryGateway(get_cursor())
-    return jsonify(gw.selectByProduct(product_id))
+    return page_response(gw.selectByProductPage(product_id, *page_args(), wants_columnar()))
 
 # ======================================================================= payments
 
@@ -263,27 +606,59 @@ def create_payment():
 
 # ======================================================================= reports
 
+def sales_report_args():
+    filters = {}
+    for name in ("order_status", "payment_status", "currency"):
+        if request.args.get(name):
+            filters[name] = request.args[name]
+    try:
+        if request.args.get("warehouse_id"):
+            filters["warehouse_id"] = int(request.args["warehouse_id"])
+        for name in ("date_from", "date_to"):
+            if request.args.get(name):
+                filters[name] = datetime.fromisoformat(request.args[name])
+    except ValueError:
+        abort(400, "warehouse_id must be an integer, date_from/date_to ISO dates")
+    group_by = list(dict.fromkeys(g for g in request.args.get("group_by", "").split(",") if g))
+    return filters, group_by
+
 @app.route("/report/sales", methods=["GET"])
+@versioned("orders", "order_items", "warehouse")
 def report_sales():
+    filters, group_by = sales_report_args()
+    columnar = wants_columnar()
     gw = SalesReportGateway(get_cursor())
-    return jsonify(gw.selectAll())
+    if not filters and not group_by:
+        return rows_response(gw.selectAll(columnar))
+    try:
+        return rows_response(gw.selectFiltered(filters, group_by, columnar))
+    except ValueError as e:
+        abort(400, str(e))
 
 @app.route("/report/stock", methods=["GET"])
+@versioned("inventory", "warehouse", "products")
 def report_stock():
     gw = StockReportGateway(get_cursor())
-    return jsonify(gw.selectAll())
+    return rows_response(gw.selectAll(wants_columnar()))
+
+@app.route("/report/sales/export", methods=["GET"])
+def export_sales_report():
+    return export_response("sales_report", export_format(), SalesReportGateway)
+
+@app.route("/report/stock/export", methods=["GET"])
+def export_stock_report():
+    return export_response("stock_report", export_format(), StockReportGateway)
     
 # ========================================================================= authorization
 
 @app.route('/authorize', methods=['GET'])
+@compression(enabled=False)
 def authorize():
-    global loggedUsers
     try:
         password = request.args.get('password')
 
         if password == getenv("API_PASSWORD"):
-            loggedUsers.append(secrets.token_hex(16))
-            return { "token": loggedUsers[-1] }
+            return { "token": tokens.issue() }
         else:
             abort(401, "Unauthorized")
         
@@ -291,17 +666,19 @@ def authorize():
         abort(401, "Unauthorized")
         
 @app.route('/logout', methods=['DELETE'])
+@compression(enabled=False)
 def logout():
-    global loggedUsers
     token = request.args.get("token")
     if not token:
         abort(401, "Missing user token")
-    for lu in loggedUsers:
-        if lu == token:
-            loggedUsers.remove(lu)
-            return jsonify({"deleted token": "succesfully"})
+    if tokens.revoke(token):
+        return jsonify({"deleted token": "succesfully"})
     return jsonify({"deleted token": "token not found"}), 404
 
 
 if __name__ == '__main__':
+    try:
+        pool.prefill()
+    except pyodbc.Error as e:
+        print(f"Could not prefill connection pool: {e}")
     app.run('0.0.0.0', int(getenv("API_SERVER_PORT", 5000)))
\ No newline at end of file
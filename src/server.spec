@@ -2,11 +2,13 @@
 
 
 a = Analysis(
-    ['server.py'],
+    ['serve.py'],
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # serve.py imports the app by name at runtime (API_APP, default server:app)
+    # uvicorn picks its protocol and loop implementations by name
+    hiddenimports=['server', 'uvicorn.loops.auto', 'uvicorn.protocols.http.auto', 'uvicorn.lifespan.on'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,166 @@
+import json
+import math
+import re
+import sys
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+_STRING = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w@#.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+OTHER = "[other statements]"
+
+
+@lru_cache(maxsize=4096)
+def normalize_sql(sql: str) -> str:
+    """
+    One line of SQL with literals replaced by ? and IN lists of any length
+    folded into IN (...), so statements that differ only in their values
+    are counted together.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class _Entry:
+    __slots__ = ("seen", "calls", "total", "min", "max", "mean", "m2", "rows", "routes")
+
+    def __init__(self):
+        self.seen = 0
+        self.calls = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        # running mean and sum of squared deviations (Welford), for stddev
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.rows = 0
+        self.routes = {}
+
+    def add(self, seconds: float, rows: int, route: str, weight: int):
+        self.calls += weight
+        self.total += seconds * weight
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        delta = seconds - self.mean
+        self.mean += delta * weight / self.calls
+        self.m2 += weight * delta * (seconds - self.mean)
+        self.rows += rows * weight
+        self.routes[route] = self.routes.get(route, 0) + weight
+
+    def as_dict(self, query: str) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.mean * 1000, 3),
+            "min_ms": round(self.min * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "stddev_ms": round(math.sqrt(self.m2 / self.calls) * 1000, 3),
+            "rows": self.rows,
+            "routes": dict(sorted(self.routes.items(), key=lambda item: -item[1])),
+        }
+
+
+class StatementStats:
+    """
+    Per-statement totals in the spirit of pg_stat_statements: calls, time
+    (execute plus fetching the result), rows and the routes that ran the
+    statement, keyed by the normalized SQL.
+
+    Statements slower than slow_ms are appended to the slow-query log (an
+    NDJSON file, or stderr without a path) and kept in a short in-memory
+    list.  After sample_after calls a statement counts as hot and only
+    every sample_every-th call is added, weighted accordingly; the slow log
+    still sees every call.  Beyond max_statements distinct statements the
+    rest share one entry.
+    """
+
+    ORDER_BY = ("total_ms", "calls", "mean_ms", "max_ms", "rows")
+
+    def __init__(self, slow_ms: float = 500, slow_log: Optional[str] = None, sample_after: int = 10000,
+                 sample_every: int = 10, max_statements: int = 5000, recent_slow: int = 100):
+        self.slow_seconds = slow_ms / 1000 if slow_ms >= 0 else math.inf
+        self.slow_log = slow_log
+        self.sample_after = sample_after
+        self.sample_every = max(1, sample_every)
+        self.max_statements = max_statements
+        self.slow_count = 0
+        self.started = time.time()
+        self._entries = {}
+        self._recent_slow = deque(maxlen=recent_slow)
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+
+    def record(self, sql: str, seconds: float, rows: int, route: str, failed: bool = False):
+        query = normalize_sql(sql)
+        if seconds >= self.slow_seconds:
+            self._log_slow(query, seconds, rows, route, failed)
+
+        entry = self._entries.get(query)
+        weight = 1
+        if entry is not None:
+            # unlocked: a lost increment only shifts the sampling phase
+            entry.seen += 1
+            if entry.seen > self.sample_after:
+                if entry.seen % self.sample_every:
+                    return
+                weight = self.sample_every
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is None:
+                if len(self._entries) >= self.max_statements:
+                    query = OTHER
+                entry = self._entries.setdefault(query, _Entry())
+                entry.seen += 1
+            entry.add(seconds, rows, route, weight)
+
+    def _log_slow(self, query: str, seconds: float, rows: int, route: str, failed: bool):
+        event = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ms": round(seconds * 1000, 1),
+            "rows": rows,
+            "route": route,
+            "failed": failed,
+            "query": query,
+        }
+        line = json.dumps(event)
+        with self._log_lock:
+            self.slow_count += 1
+            self._recent_slow.append(event)
+            if self.slow_log:
+                with open(self.slow_log, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            else:
+                print(f"slow query {line}", file=sys.stderr, flush=True)
+
+    def reset(self):
+        with self._lock:
+            self._entries = {}
+            self.started = time.time()
+        with self._log_lock:
+            self._recent_slow.clear()
+
+    def stats(self, limit: int = 50, order_by: str = "total_ms") -> Dict[str, Any]:
+        with self._lock:
+            statements = [entry.as_dict(query) for query, entry in self._entries.items()]
+        statements.sort(key=lambda s: -s[order_by])
+        with self._log_lock:
+            recent_slow = list(self._recent_slow)
+        return {
+            "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "statements_tracked": len(statements),
+            "slow_threshold_ms": self.slow_seconds * 1000 if self.slow_seconds != math.inf else None,
+            "slow_queries": self.slow_count,
+            "sample_after": self.sample_after,
+            "sample_every": self.sample_every,
+            "statements": statements[:limit],
+            "recent_slow": recent_slow,
+        }
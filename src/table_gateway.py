@@ -1,6 +1,11 @@
 import pyodbc
+import threading
+from functools import wraps
 from json import dumps
-from typing import List, Dict, Any
+from time import perf_counter
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple, Union
+
+from columnar import Columnar
 
 def row_to_dict(cursor, row) -> Dict[str, Any]:
     columns = [c[0] for c in cursor.description]
@@ -10,10 +15,245 @@ def rows_to_dicts(cursor, rows) -> List[Dict[str, Any]]:
     columns = [c[0] for c in cursor.description]
     return [dict(zip(columns, row)) for row in rows]
 
-class TableGateway:
+def rows_to_columnar(cursor, rows) -> Columnar:
+    columns = [c[0] for c in cursor.description]
+    return Columnar(columns, [tuple(row) for row in rows])
+
+def shape_rows(cursor, rows, columnar: bool = False) -> Union[List[Dict[str, Any]], Columnar]:
+    return rows_to_columnar(cursor, rows) if columnar else rows_to_dicts(cursor, rows)
+
+def page_of(cursor, limit: int, columnar: bool = False) -> Tuple[Union[List[Dict[str, Any]], Columnar], Optional[int]]:
+    """
+    Fetches at most limit + 1 rows of a query ordered by id; the extra row only
+    tells whether another page exists.  Returns (rows, next_cursor).
+    """
+    rows = cursor.fetchmany(limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        id_index = [c[0] for c in cursor.description].index("id")
+        next_cursor = rows[-1][id_index]
+    return shape_rows(cursor, rows, columnar), next_cursor
+
+def stream_batches(cursor, batch_size: int) -> Tuple[List[str], Iterator[list]]:
+    """
+    Returns the column names of the executed query and a generator of row
+    batches read with fetchmany, so callers never hold the whole result.
+    """
+    columns = [c[0] for c in cursor.description]
+
+    def batches():
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+    return columns, batches()
+
+class TimedCursor:
+    """
+    Cursor wrapper that adds up the time spent in execute() and in fetching,
+    and the rows fetched, so a gateway call can be split into SQL time and
+    Python time.  With statements (a StatementStats), every statement is
+    also recorded with its time, rows and route once its result is drained,
+    the next statement runs or finish() is called.  Everything else is
+    passed to the wrapped cursor.
+    """
+
+    _own = ("_cursor", "execute_time", "fetch_time", "rows", "statements", "route",
+            "_sql", "_sql_time", "_sql_rows", "_sql_failed")
+
+    def __init__(self, cursor, statements=None, route: str = ""):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "execute_time", 0.0)
+        object.__setattr__(self, "fetch_time", 0.0)
+        object.__setattr__(self, "rows", 0)
+        object.__setattr__(self, "statements", statements)
+        object.__setattr__(self, "route", route)
+        object.__setattr__(self, "_sql", None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        if name in self._own:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+    def _started(self, sql, elapsed: float, failed: bool):
+        self.execute_time += elapsed
+        if self.statements is not None:
+            self.finish()
+            self._sql, self._sql_time, self._sql_rows, self._sql_failed = sql, elapsed, 0, failed
+            if failed:
+                self.finish()
+
+    def _fetched(self, elapsed: float, rows: int, drained: bool):
+        self.fetch_time += elapsed
+        self.rows += rows
+        if self._sql is not None:
+            self._sql_time += elapsed
+            self._sql_rows += rows
+            if drained:
+                self.finish()
+
+    def finish(self):
+        """Records the current statement, if any, as complete."""
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            self.statements.record(sql, self._sql_time, self._sql_rows, self.route, self._sql_failed)
+
+    def execute(self, sql, *params):
+        started = perf_counter()
+        failed = True
+        try:
+            self._cursor.execute(sql, *params)
+            failed = False
+        finally:
+            self._started(sql, perf_counter() - started, failed)
+        return self
+
+    def executemany(self, sql, params):
+        started = perf_counter()
+        failed = True
+        try:
+            self._cursor.executemany(sql, params)
+            failed = False
+        finally:
+            self._started(sql, perf_counter() - started, failed)
+
+    def fetchone(self):
+        started = perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(perf_counter() - started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size: int = 1):
+        started = perf_counter()
+        rows = self._cursor.fetchmany(size)
+        self._fetched(perf_counter() - started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(perf_counter() - started, len(rows), True)
+        return rows
+
+    def close(self):
+        self.finish()
+        self._cursor.close()
+
+# called as observer(name, sql_seconds, python_seconds, rows) after every
+# public gateway method that ran on a TimedCursor; see observe_gateways
+gateway_observer: Optional[Callable[[str, float, float, int], None]] = None
+
+def observe_gateways(observer: Optional[Callable[[str, float, float, int], None]]):
+    global gateway_observer
+    gateway_observer = observer
+
+def _timed(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        observer = gateway_observer
+        cursor = self.cursor
+        if observer is None or not isinstance(cursor, TimedCursor):
+            return method(self, *args, **kwargs)
+        execute_time, rows = cursor.execute_time, cursor.rows
+        started = perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            sql_time = cursor.execute_time - execute_time
+            observer(f"{type(self).__name__}.{method.__name__}", sql_time,
+                     perf_counter() - started - sql_time, cursor.rows - rows)
+    return wrapper
+
+class Gateway:
+    """Base of all gateways: their public methods report to gateway_observer."""
+
     def __init__(self, cursor: pyodbc.Cursor):
         self.cursor = cursor
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, attr in list(vars(cls).items()):
+            if not name.startswith("_") and callable(attr) and not isinstance(attr, (classmethod, staticmethod)):
+                setattr(cls, name, _timed(attr))
+
+class UpdateTemplates:
+    """
+    UPDATE ... WHERE id = ? statements per table and set of columns.  The
+    keys are checked against the table's columns and always set in table
+    order, so every request with the same keys sends the same SQL text and
+    SQL Server reuses one cached plan.  Counts lookups per table.
+    """
+
+    def __init__(self):
+        self._templates = {}
+        self.hits = {}
+        self.misses = {}
+        # request threads share one instance; guards the templates and counters
+        self._lock = threading.Lock()
+
+    def get(self, table: str, columns: Tuple[str, ...], keys) -> Tuple[str, Tuple[str, ...]]:
+        """Returns (sql, columns in parameter order); ValueError for unknown keys."""
+        key = (table, frozenset(keys))
+        with self._lock:
+            found = self._templates.get(key)
+            if found is not None:
+                self.hits[table] = self.hits.get(table, 0) + 1
+                return found
+        unknown = [k for k in keys if k not in columns]
+        if unknown:
+            raise ValueError(f"unknown {table} column: " + ", ".join(map(str, unknown)))
+        ordered = tuple(c for c in columns if c in key[1])
+        sql = f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in ordered)} WHERE id = ?"
+        with self._lock:
+            self.misses[table] = self.misses.get(table, 0) + 1
+            return self._templates.setdefault(key, (sql, ordered))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            hits_by_table, misses_by_table = dict(self.hits), dict(self.misses)
+            templates = list(self._templates)
+        found = {}
+        for table in sorted(set(hits_by_table) | set(misses_by_table)):
+            hits, misses = hits_by_table.get(table, 0), misses_by_table.get(table, 0)
+            found[table] = {
+                "templates": sum(1 for t, _ in templates if t == table),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4),
+            }
+        return found
+
+update_templates = UpdateTemplates()
+
+class TableGateway(Gateway):
+    table: str = None
+    # the table's columns besides id, in table order: updateById may set them
+    # and selects list them, since SELECT * would also return rv
+    columns: Tuple[str, ...] = ()
+    select_list: str = "*"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.columns:
+            cls.select_list = ", ".join(("id",) + cls.columns)
+
+    def _selectPage(self, where: str, params: list, after_id: int, limit: int, columnar: bool = False):
+        self.cursor.execute(
+            f"SELECT TOP (?) {self.select_list} FROM {self.table} WHERE {where}id > ? ORDER BY id",
+            limit + 1, *params, after_id
+        )
+        return page_of(self.cursor, limit, columnar)
+
+    def selectPage(self, after_id: int = 0, limit: int = 100, columnar: bool = False):
+        return self._selectPage("", [], after_id, limit, columnar)
+
     def insert(self, *args, **kwargs):
         raise NotImplementedError
 
@@ -23,6 +263,12 @@ class TableGateway:
     def updateById(self, id: int, new_data: dict):
         raise NotImplementedError
 
+    def _updateById(self, id: int, data: dict):
+        if not isinstance(data, dict):
+            raise ValueError("expected a JSON object of columns")
+        sql, columns = update_templates.get(self.table, self.columns, data)
+        self.cursor.execute(sql, [data[c] for c in columns] + [id])
+
     def deleteById(self, id: int):
         raise NotImplementedError
 
@@ -31,6 +277,10 @@ class TableGateway:
 
 
 class OrdersGateway(TableGateway):
+    table = "orders"
+    columns = ("id_user", "status_id", "payment_status", "warehouse_id", "total_amount", "currency",
+               "shipping_address", "billing_address", "created_at", "updated_at")
+
     def __init__(self, cursor: pyodbc.Cursor):
         super().__init__(cursor)
 
@@ -45,8 +295,22 @@ class OrdersGateway(TableGateway):
         self.cursor.execute(sql, user_id, dumps(shipping_address), dumps(billing_address), currency)
         return self.cursor.messages
 
+    def insertMany(self, orders: List[Dict[str, Any]]) -> List[int]:
+        """
+        Creates all orders with one call of tg_order_create_batch, passing them
+        as a table-valued parameter.  Returns the new ids in input order.
+        """
+        if not orders:
+            return []
+        rows = [
+            (seq, o["user_id"], dumps(o["shipping_address"]), dumps(o["billing_address"]), o["currency"])
+            for seq, o in enumerate(orders)
+        ]
+        self.cursor.execute("EXEC [dbo].[tg_order_create_batch] @orders = ?", (rows,))
+        return [order_id for _, order_id in self.cursor.fetchall()]
+
     def selectById(self, id: int) -> Dict[str, Any]:
-        self.cursor.execute("SELECT * FROM orders WHERE id = ?", id)
+        self.cursor.execute(f"SELECT {self.select_list} FROM orders WHERE id = ?", id)
         row = self.cursor.fetchone()
         if not row:
             return {}
@@ -56,11 +320,7 @@ class OrdersGateway(TableGateway):
     def updateById(self, id: int, new_data: dict):
         if not new_data:
             return
-        columns = ", ".join(f"{k} = ?" for k in new_data.keys())
-        values = list(new_data.values())
-        values.append(id)
-        sql = f"UPDATE orders SET {columns} WHERE id = ?"
-        self.cursor.execute(sql, values)
+        self._updateById(id, new_data)
         return self.cursor.messages
 
     def deleteById(self, id: int):
@@ -68,11 +328,13 @@ class OrdersGateway(TableGateway):
         return self.cursor.messages
 
     def selectAll(self) -> List[Dict[str, Any]]:
-        self.cursor.execute("SELECT * FROM orders")
+        self.cursor.execute(f"SELECT {self.select_list} FROM orders")
         columns = [c[0] for c in self.cursor.description]
         return [dict(zip(columns, row)) for row in self.cursor.fetchall()]
 
 class WarehouseGateway(TableGateway):
+    table = "warehouse"
+    columns = ("warehouse_name", "location_code", "is_active")
 
     def insert(self, name: str, location_code: str, is_active: bool):
         self.cursor.execute(
@@ -81,25 +343,25 @@ class WarehouseGateway(TableGateway):
         )
 
     def selectById(self, id: int):
-        self.cursor.execute("SELECT * FROM warehouse WHERE id = ?", id)
+        self.cursor.execute(f"SELECT {self.select_list} FROM warehouse WHERE id = ?", id)
         row = self.cursor.fetchone()
         return row_to_dict(self.cursor, row) if row else {}
 
     def updateById(self, id: int, data: dict):
         if not data:
             return
-        cols = ", ".join(f"{k} = ?" for k in data)
-        values = list(data.values()) + [id]
-        self.cursor.execute(f"UPDATE warehouse SET {cols} WHERE id = ?", values)
+        self._updateById(id, data)
 
     def deleteById(self, id: int):
         self.cursor.execute("DELETE FROM warehouse WHERE id = ?", id)
 
     def selectAll(self):
-        self.cursor.execute("SELECT * FROM warehouse")
+        self.cursor.execute(f"SELECT {self.select_list} FROM warehouse")
         return rows_to_dicts(self.cursor, self.cursor.fetchall())
 
 class ProductsGateway(TableGateway):
+    table = "products"
+    columns = ("product_name", "unit_price", "tax_rate")
 
     def insert(self, name: str, unit_price: float, tax_rate: float):
         self.cursor.execute(
@@ -108,28 +370,26 @@ class ProductsGateway(TableGateway):
         )
 
     def selectById(self, id: int):
-        self.cursor.execute("SELECT * FROM products WHERE id = ?", id)
+        self.cursor.execute(f"SELECT {self.select_list} FROM products WHERE id = ?", id)
         row = self.cursor.fetchone()
         return row_to_dict(self.cursor, row) if row else {}
 
     def updateById(self, id: int, data: dict):
         if not data:
             return
-        cols = ", ".join(f"{k} = ?" for k in data)
-        self.cursor.execute(
-            f"UPDATE products SET {cols} WHERE id = ?",
-            list(data.values()) + [id]
-        )
+        self._updateById(id, data)
 
     def deleteById(self, id: int):
         self.cursor.execute("DELETE FROM products WHERE id = ?", id)
 
     def selectAll(self):
-        self.cursor.execute("SELECT * FROM products")
+        self.cursor.execute(f"SELECT {self.select_list} FROM products")
         return rows_to_dicts(self.cursor, self.cursor.fetchall())
     
 
 class OrderItemsGateway(TableGateway):
+    table = "order_items"
+    columns = ("order_id", "product_id", "quantity", "unit_price", "tax_rate")
 
     def addItem(self, order_id: int, product_id: int, quantity: int):
         self.cursor.execute(
@@ -137,12 +397,28 @@ class OrderItemsGateway(TableGateway):
             order_id, product_id, quantity
         )
 
+    def addItems(self, order_id: int, items: List[Dict[str, Any]]):
+        """
+        Adds all lines with one call of tg_order_item_add_bulk: prices and tax
+        are looked up in one query and the order total is updated once.
+        """
+        if not items:
+            return
+        rows = [(seq, i["product_id"], i["quantity"]) for seq, i in enumerate(items)]
+        self.cursor.execute(
+            "EXEC dbo.tg_order_item_add_bulk @order_id = ?, @items = ?",
+            order_id, rows
+        )
+
     def selectByOrder(self, order_id: int):
         self.cursor.execute(
-            "SELECT * FROM order_items WHERE order_id = ?",
+            f"SELECT {self.select_list} FROM order_items WHERE order_id = ?",
             order_id
         )
         return rows_to_dicts(self.cursor, self.cursor.fetchall())
+
+    def selectByOrderPage(self, order_id: int, after_id: int = 0, limit: int = 100, columnar: bool = False):
+        return self._selectPage("order_id = ? AND ", [order_id], after_id, limit, columnar)
     
     def removeItemByNameAndOrder(self, name: str, order_id: int):
         self.cursor.execute(
@@ -151,41 +427,104 @@ class OrderItemsGateway(TableGateway):
         )
 
 class InventoryGateway(TableGateway):
+    table = "inventory"
+    columns = ("warehouse_id", "product_id", "quantity_available", "quantity_reserved")
+
     def insert(self, warehouse_id: int, product_id: int, quantity_available: float, quantity_reserved: float = 0):
         self.cursor.execute(
             "INSERT INTO inventory (warehouse_id, product_id, quantity_available, quantity_reserved) VALUES (?, ?, ?, ?)",
             warehouse_id, product_id, quantity_available, quantity_reserved
         )
 
+    def upsertMany(self, rows: List[tuple]) -> Tuple[int, int, int]:
+        """
+        Upserts (warehouse_id, product_id, quantity_available, quantity_reserved)
+        rows keyed on the unique (warehouse_id, product_id) index: they are
+        loaded into a session temp table with fast_executemany and applied with
+        one MERGE.  A None quantity_reserved keeps the stored value (0 for new
+        rows).  The rows must not repeat a key.  Rows naming an unknown
+        warehouse or product are skipped.  Returns (inserted, updated, rejected).
+        """
+        if not rows:
+            return 0, 0, 0
+        self.cursor.execute("""
+            IF OBJECT_ID('tempdb..#inventory_staging') IS NULL
+                CREATE TABLE #inventory_staging (
+                    warehouse_id INT NOT NULL,
+                    product_id INT NOT NULL,
+                    quantity_available INT NOT NULL,
+                    quantity_reserved INT NULL
+                );
+            ELSE
+                TRUNCATE TABLE #inventory_staging;
+        """)
+        self.cursor.fast_executemany = True
+        try:
+            self.cursor.executemany("INSERT INTO #inventory_staging VALUES (?, ?, ?, ?)", rows)
+        finally:
+            self.cursor.fast_executemany = False
+        self.cursor.execute("""
+            SET NOCOUNT ON;
+            DECLARE @actions TABLE (action NVARCHAR(10));
+
+            MERGE inventory AS t
+            USING (
+                SELECT s.*
+                FROM #inventory_staging s
+                WHERE EXISTS (SELECT 1 FROM warehouse w WHERE w.id = s.warehouse_id)
+                  AND EXISTS (SELECT 1 FROM products p WHERE p.id = s.product_id)
+            ) AS s
+            ON t.warehouse_id = s.warehouse_id AND t.product_id = s.product_id
+            WHEN MATCHED THEN
+                UPDATE SET quantity_available = s.quantity_available,
+                           quantity_reserved = COALESCE(s.quantity_reserved, t.quantity_reserved)
+            WHEN NOT MATCHED THEN
+                INSERT (warehouse_id, product_id, quantity_available, quantity_reserved)
+                VALUES (s.warehouse_id, s.product_id, s.quantity_available, COALESCE(s.quantity_reserved, 0))
+            OUTPUT $action INTO @actions;
+
+            SELECT
+                COUNT(CASE WHEN action = 'INSERT' THEN 1 END),
+                COUNT(CASE WHEN action = 'UPDATE' THEN 1 END)
+            FROM @actions;
+        """)
+        inserted, updated = self.cursor.fetchone()
+        return inserted, updated, len(rows) - inserted - updated
+
     def selectByWarehouse(self, warehouse_id: int):
         self.cursor.execute(
-            "SELECT * FROM inventory WHERE warehouse_id = ?",
+            f"SELECT {self.select_list} FROM inventory WHERE warehouse_id = ?",
             warehouse_id
         )
         return rows_to_dicts(self.cursor, self.cursor.fetchall())
 
     def selectByProduct(self, product_id: int):
         self.cursor.execute(
-            "SELECT * FROM inventory WHERE product_id = ?",
+            f"SELECT {self.select_list} FROM inventory WHERE product_id = ?",
             product_id
         )
         return rows_to_dicts(self.cursor, self.cursor.fetchall())
+
+    def selectByWarehousePage(self, warehouse_id: int, after_id: int = 0, limit: int = 100, columnar: bool = False):
+        return self._selectPage("warehouse_id = ? AND ", [warehouse_id], after_id, limit, columnar)
+
+    def selectByProductPage(self, product_id: int, after_id: int = 0, limit: int = 100, columnar: bool = False):
+        return self._selectPage("product_id = ? AND ", [product_id], after_id, limit, columnar)
     
     def updateById(self, id: int, data: dict):
         if not data:
             return
-        cols = ", ".join(f"{k} = ?" for k in data)
-        values = list(data.values()) + [id]
-        self.cursor.execute(f"UPDATE inventory SET {cols} WHERE id = ?", values)
+        self._updateById(id, data)
 
     def deleteById(self, id: int):
         self.cursor.execute("DELETE FROM inventory WHERE id = ?", id)
 
     def selectAll(self):
-        self.cursor.execute("SELECT * FROM inventory")
+        self.cursor.execute(f"SELECT {self.select_list} FROM inventory")
         return rows_to_dicts(self.cursor, self.cursor.fetchall())
 
 class PaymentsGateway(TableGateway):
+    table = "payments"
 
     def insert(self, order_id: int, provider: str, transaction_id: str):
         self.cursor.execute(
@@ -203,10 +542,7 @@ class PaymentsGateway(TableGateway):
         )
         return rows_to_dicts(self.cursor, self.cursor.fetchall())
 
-class OrderSummaryViewGateway:
-
-    def __init__(self, cursor):
-        self.cursor = cursor
+class OrderSummaryViewGateway(Gateway):
 
     def selectByUser(self, user_id: int):
         self.cursor.execute(
@@ -215,10 +551,7 @@ class OrderSummaryViewGateway:
         )
         return rows_to_dicts(self.cursor, self.cursor.fetchall())
 
-class OrderItemsViewGateway:
-
-    def __init__(self, cursor):
-        self.cursor = cursor
+class OrderItemsViewGateway(Gateway):
 
     def selectByOrder(self, order_id: int):
         self.cursor.execute(
@@ -227,18 +560,132 @@ class OrderItemsViewGateway:
         )
         return rows_to_dicts(self.cursor, self.cursor.fetchall())
     
-class SalesReportGateway:
-    def __init__(self, cursor):
-        self.cursor = cursor
-
-    def selectAll(self):
-        self.cursor.execute("SELECT * FROM v_sales_report")
+class SalesReportGateway(Gateway):
+    # group_by option -> [(expression, column name)]
+    GROUPS = {
+        "day": [("CONVERT(char(10), s.created_at, 23)", "day")],
+        # weeks start on Monday; 1900-01-01 was a Monday
+        "week": [("CONVERT(char(10), DATEADD(day, DATEDIFF(day, '19000101', s.created_at) / 7 * 7, CAST('19000101' AS date)), 23)", "week")],
+        "month": [("CONVERT(char(7), s.created_at, 126)", "month")],
+        "warehouse": [("s.warehouse_id", "warehouse_id"), ("w.warehouse_name", "warehouse_name")],
+        "status": [("os.status_name", "order_status")],
+        "payment_status": [("ps.status_name", "payment_status")],
+        "currency": [("s.currency", "currency")],
+        "all": [],
+    }
+
+    # filter name -> condition
+    FILTERS = {
+        "date_from": "s.created_at >= ?",
+        "date_to": "s.created_at < ?",
+        "order_status": "os.status_name = ?",
+        "payment_status": "ps.status_name = ?",
+        "warehouse_id": "s.warehouse_id = ?",
+        "currency": "s.currency = ?",
+    }
+
+    @classmethod
+    def buildQuery(cls, filters: Dict[str, Any], group_by: List[str]) -> Tuple[str, list]:
+        """
+        Builds a parameterized query over sales_summary.  Without group_by it
+        returns v_sales_summary rows; with it, order counts and totals per
+        group, computed by SQL Server.  Raises ValueError for unknown options.
+        """
+        unknown = [g for g in group_by if g not in cls.GROUPS] + [f for f in filters if f not in cls.FILTERS]
+        if unknown:
+            raise ValueError("unknown report option: " + ", ".join(unknown))
+
+        where = [cls.FILTERS[name] for name in filters]
+        params = list(filters.values())
+        sql_from = """
+            FROM sales_summary s
+            JOIN order_status os ON s.status_id = os.id
+            JOIN payment_status ps ON s.payment_status = ps.id
+            JOIN warehouse w ON s.warehouse_id = w.id
+        """
+        sql_where = ("WHERE " + " AND ".join(where)) if where else ""
+
+        if not group_by:
+            return f"""
+                SELECT
+                    s.order_id, s.user_id, os.status_name AS order_status, ps.status_name AS payment_status,
+                    s.total_amount, s.currency, w.warehouse_name, s.created_at,
+                    CASE WHEN s.line_count = 0 THEN NULL ELSE s.total_items END AS total_items,
+                    CASE WHEN s.line_count = 0 THEN NULL ELSE s.total_amount_calculated END AS total_amount_calculated
+                {sql_from}
+                {sql_where}
+                ORDER BY s.order_id
+            """, params
+
+        group = [expr for g in group_by for expr, _ in cls.GROUPS[g]]
+        select = [f"{expr} AS {name}" for g in group_by for expr, name in cls.GROUPS[g]]
+        select += [
+            "COUNT(*) AS order_count",
+            "SUM(s.total_amount) AS total_amount",
+            "SUM(s.total_items) AS total_items",
+            "SUM(s.total_amount_calculated) AS total_amount_calculated",
+        ]
+        sql_group = ("GROUP BY " + ", ".join(group) + " ORDER BY " + ", ".join(group)) if group else ""
+        return f"""
+            SELECT {", ".join(select)}
+            {sql_from}
+            {sql_where}
+            {sql_group}
+        """, params
+
+    def selectFiltered(self, filters: Dict[str, Any], group_by: List[str], columnar: bool = False):
+        sql, params = self.buildQuery(filters, group_by)
+        self.cursor.execute(sql, *params)
+        return shape_rows(self.cursor, self.cursor.fetchall(), columnar)
+
+    # v_sales_summary reads the trigger-maintained sales_summary table and
+    # returns the same rows as v_sales_report without regrouping order items
+
+    def selectAll(self, columnar: bool = False):
+        self.cursor.execute("SELECT * FROM v_sales_summary")
+        return shape_rows(self.cursor, self.cursor.fetchall(), columnar)
+
+    def streamAll(self, batch_size: int = 1000):
+        self.cursor.execute("SELECT * FROM v_sales_summary ORDER BY order_id")
+        return stream_batches(self.cursor, batch_size)
+
+    def selectSummaryDrift(self):
+        """Rows where sales_summary disagrees with a fresh aggregation by v_sales_report."""
+        self.cursor.execute("""
+            SELECT 'missing' AS problem, * FROM (
+                SELECT * FROM v_sales_report EXCEPT SELECT * FROM v_sales_summary
+            ) AS expected
+            UNION ALL
+            SELECT 'unexpected' AS problem, * FROM (
+                SELECT * FROM v_sales_summary EXCEPT SELECT * FROM v_sales_report
+            ) AS actual
+            ORDER BY order_id, problem
+        """)
         return rows_to_dicts(self.cursor, self.cursor.fetchall())
 
-class StockReportGateway:
-    def __init__(self, cursor):
-        self.cursor = cursor
+    def rebuildSummary(self):
+        self.cursor.execute("EXEC dbo.tg_sales_summary_rebuild")
 
-    def selectAll(self):
+class StockReportGateway(Gateway):
+    def selectAll(self, columnar: bool = False):
         self.cursor.execute("SELECT * FROM v_stock_report")
-        return rows_to_dicts(self.cursor, self.cursor.fetchall())
+        return shape_rows(self.cursor, self.cursor.fetchall(), columnar)
+
+    def streamAll(self, batch_size: int = 1000):
+        self.cursor.execute("SELECT * FROM v_stock_report ORDER BY inventory_id")
+        return stream_batches(self.cursor, batch_size)
+
+class TableVersionsGateway(Gateway):
+    """
+    Versions of tables from their rowversion column: MAX(rv) moves on every
+    insert and update, COUNT_BIG(*) on deletes.  Neither needs a row that
+    concurrent writers would have to share.
+    """
+    TABLES = ("orders", "order_items", "products", "warehouse", "inventory")
+
+    def selectVersion(self, table: str) -> str:
+        if table not in self.TABLES:
+            raise ValueError("table has no rowversion: " + table)
+        self.cursor.execute(f"SELECT MAX(rv), COUNT_BIG(*) FROM {table}")
+        rv, count = self.cursor.fetchone()
+        return f"{(rv or b'').hex()}.{count}"
@@ -0,0 +1,173 @@
+import hashlib
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict
+
+
+def token_hash(token: str) -> str:
+    # only digests are stored, so a leaked store does not leak usable tokens
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenStore:
+    """
+    Login tokens with a fixed lifetime.  Expired tokens are dropped when they
+    are looked up and, at most every purge_interval seconds, in one sweep.
+    Beyond max_tokens the oldest tokens are revoked.
+    """
+
+    def __init__(self, ttl: float = 28800.0, max_tokens: int = 10000, purge_interval: float = 60.0):
+        self.ttl = ttl
+        self.max_tokens = max_tokens
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+
+    def issue(self) -> str:
+        token = secrets.token_hex(16)
+        now = time.time()
+        self._maybe_purge(now)
+        self._add(token_hash(token), now + self.ttl)
+        return token
+
+    def validate(self, token: str) -> bool:
+        now = time.time()
+        self._maybe_purge(now)
+        return self._check(token_hash(token), now)
+
+    def revoke(self, token: str) -> bool:
+        return self._remove(token_hash(token))
+
+    def _maybe_purge(self, now: float):
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            self.purge(now)
+
+    def purge(self, now: float = None) -> int:
+        raise NotImplementedError
+
+    def _add(self, digest: str, expires_at: float):
+        raise NotImplementedError
+
+    def _check(self, digest: str, now: float) -> bool:
+        raise NotImplementedError
+
+    def _remove(self, digest: str) -> bool:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class MemoryTokenStore(TokenStore):
+    """Dict of digests in issue order; only valid inside one process."""
+
+    def __init__(self, ttl: float = 28800.0, max_tokens: int = 10000, purge_interval: float = 60.0):
+        super().__init__(ttl, max_tokens, purge_interval)
+        self._tokens = OrderedDict()  # digest -> expires_at, oldest first
+        self._lock = threading.Lock()
+
+    def _add(self, digest: str, expires_at: float):
+        with self._lock:
+            self._tokens[digest] = expires_at
+            while len(self._tokens) > self.max_tokens:
+                self._tokens.popitem(last=False)
+
+    def _check(self, digest: str, now: float) -> bool:
+        with self._lock:
+            expires_at = self._tokens.get(digest)
+            if expires_at is None:
+                return False
+            if expires_at <= now:
+                del self._tokens[digest]
+                return False
+            return True
+
+    def _remove(self, digest: str) -> bool:
+        with self._lock:
+            return self._tokens.pop(digest, None) is not None
+
+    def purge(self, now: float = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            # every token has the same ttl, so issue order is expiry order
+            expired = 0
+            while self._tokens:
+                digest, expires_at = next(iter(self._tokens.items()))
+                if expires_at > now:
+                    break
+                del self._tokens[digest]
+                expired += 1
+            return expired
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "memory", "tokens": len(self._tokens), "max_tokens": self.max_tokens, "ttl": self.ttl}
+
+
+class SQLiteTokenStore(TokenStore):
+    """
+    Digests in a SQLite file shared by every worker process on the host.
+    Each thread keeps its own connection; WAL lets readers run alongside
+    the occasional login.  max_tokens is enforced in the periodic sweep
+    rather than on every login, so it can be exceeded by the logins of one
+    purge_interval.
+    """
+
+    def __init__(self, path: str, ttl: float = 28800.0, max_tokens: int = 10000, purge_interval: float = 60.0):
+        super().__init__(ttl, max_tokens, purge_interval)
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tokens (
+                    digest TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_tokens_expires_at ON tokens (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _add(self, digest: str, expires_at: float):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO tokens (digest, expires_at) VALUES (?, ?)", (digest, expires_at))
+
+    def _check(self, digest: str, now: float) -> bool:
+        conn = self._connect()
+        row = conn.execute("SELECT expires_at FROM tokens WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return False
+        if row[0] <= now:
+            self._remove(digest)
+            return False
+        return True
+
+    def _remove(self, digest: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM tokens WHERE digest = ?", (digest,)).rowcount > 0
+
+    def purge(self, now: float = None) -> int:
+        now = time.time() if now is None else now
+        with self._connect() as conn:
+            expired = conn.execute("DELETE FROM tokens WHERE expires_at <= ?", (now,)).rowcount
+            # everything past the newest max_tokens, walking ix_tokens_expires_at
+            conn.execute("""
+                DELETE FROM tokens WHERE digest IN (
+                    SELECT digest FROM tokens ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_tokens,))
+            return expired
+
+    def stats(self) -> Dict[str, Any]:
+        count, = self._connect().execute("SELECT COUNT(*) FROM tokens").fetchone()
+        return {"backend": "sqlite", "path": self.path, "tokens": count, "max_tokens": self.max_tokens, "ttl": self.ttl}
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the modules are imported the way the servers import them: flat, from their directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ("src", "server_emulator_no_db"):
+    sys.path.insert(0, os.path.join(ROOT, directory))
@@ -0,0 +1,23 @@
+from asgi import build_environ
+
+
+def scope(**values):
+    return dict({
+        "type": "http", "method": "GET", "http_version": "1.1", "path": "/products",
+        "query_string": b"", "headers": [], "server": ("127.0.0.1", 5000), "client": ("127.0.0.1", 50000),
+    }, **values)
+
+
+def test_query_string_is_latin1_decoded():
+    # raw bytes as a client may send them, not percent-encoded
+    environ = build_environ(scope(query_string="name=čaj".encode("utf-8")), None)
+    assert environ["QUERY_STRING"].encode("latin-1") == "name=čaj".encode("utf-8")
+
+
+def test_path_and_headers_follow_pep_3333():
+    environ = build_environ(scope(path="/products/č", headers=[
+        (b"content-type", b"application/json"), (b"x-tag", b"a"), (b"x-tag", b"b"),
+    ]), None)
+    assert environ["PATH_INFO"].encode("latin-1").decode("utf-8") == "/products/č"
+    assert environ["CONTENT_TYPE"] == "application/json"
+    assert environ["HTTP_X_TAG"] == "a,b"
@@ -0,0 +1,108 @@
+import threading
+import time
+
+from cache import FileInvalidationChannel, TTLCache
+
+
+class Loader:
+    def __init__(self, value="value"):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_second_lookup_is_a_hit():
+    cache = TTLCache()
+    load = Loader()
+    assert cache.get_or_load(("products", 1), load) == "value"
+    assert cache.get_or_load(("products", 1), load) == "value"
+    assert load.calls == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entry_expires_after_ttl():
+    cache = TTLCache(ttl=0.05)
+    load = Loader()
+    cache.get_or_load(("products", 1), load)
+    time.sleep(0.1)
+    cache.get_or_load(("products", 1), load)
+    assert load.calls == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2)
+    load = Loader()
+    cache.get_or_load(("products", 1), load)
+    cache.get_or_load(("products", 2), load)
+    cache.get_or_load(("products", 1), load)
+    cache.get_or_load(("products", 3), load)
+    assert cache.stats()["evictions"] == 1
+    cache.get_or_load(("products", 1), load)
+    assert load.calls == 3
+    cache.get_or_load(("products", 2), load)
+    assert load.calls == 4
+
+
+def test_invalidate_drops_only_its_namespace():
+    cache = TTLCache()
+    products, warehouse = Loader(), Loader()
+    cache.get_or_load(("products", 1), products)
+    cache.get_or_load(("products", 2), products)
+    cache.get_or_load(("warehouse", 1), warehouse)
+    cache.invalidate("products")
+    cache.get_or_load(("products", 1), products)
+    cache.get_or_load(("warehouse", 1), warehouse)
+    assert products.calls == 3
+    assert warehouse.calls == 1
+
+
+def test_value_loaded_across_an_invalidation_is_not_cached():
+    cache = TTLCache()
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        loading.set()
+        release.wait(5)
+        return "stale"
+
+    loader = threading.Thread(target=lambda: cache.get_or_load(("products", 1), slow_load))
+    loader.start()
+    loading.wait(5)
+    cache.invalidate("products")
+    release.set()
+    loader.join(5)
+    assert cache.get_or_load(("products", 1), Loader("fresh")) == "fresh"
+
+
+def test_channel_reports_a_publish_from_another_process(tmp_path):
+    mine = FileInvalidationChannel(str(tmp_path), poll_interval=0)
+    theirs = FileInvalidationChannel(str(tmp_path), poll_interval=0)
+    assert not mine.changed("products")
+    theirs.publish("products")
+    assert mine.changed("products")
+    assert not mine.changed("products")
+    # a publisher is not told about its own write
+    assert not theirs.changed("products")
+
+
+def test_channel_polls_at_most_every_poll_interval(tmp_path):
+    mine = FileInvalidationChannel(str(tmp_path), poll_interval=60)
+    theirs = FileInvalidationChannel(str(tmp_path), poll_interval=0)
+    mine.changed("products")
+    theirs.publish("products")
+    assert not mine.changed("products")
+
+
+def test_invalidation_reaches_other_caches_through_the_channel(tmp_path):
+    mine = TTLCache(channel=FileInvalidationChannel(str(tmp_path), poll_interval=0))
+    theirs = TTLCache(channel=FileInvalidationChannel(str(tmp_path), poll_interval=0))
+    load = Loader()
+    mine.get_or_load(("products", 1), load)
+    theirs.invalidate("products")
+    mine.get_or_load(("products", 1), load)
+    assert load.calls == 2
+    assert mine.stats()["invalidations"] == 1
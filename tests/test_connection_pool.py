@@ -0,0 +1,173 @@
+import threading
+import time
+
+import pytest
+
+from connection_pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql):
+        self.conn.pings += 1
+        if self.conn.broken:
+            raise RuntimeError("connection is broken")
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.rollbacks = 0
+        self.pings = 0
+        self.broken = False
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**options):
+    opened = []
+
+    def factory():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    options.setdefault("min_size", 0)
+    return ConnectionPool(factory, **options), opened
+
+
+def test_release_makes_the_connection_reusable():
+    pool, opened = make_pool(max_size=2)
+    conn = pool.acquire()
+    assert pool.stats()["in_use"] == 1
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(opened) == 1
+    assert pool.stats()["acquired"] == 2
+
+
+def test_prefill_opens_min_size_connections():
+    pool, opened = make_pool(min_size=3, max_size=5)
+    pool.prefill()
+    assert len(opened) == 3
+    assert pool.stats()["idle"] == 3
+
+
+def test_release_rolls_back():
+    pool, _ = make_pool()
+    conn = pool.acquire()
+    pool.release(conn)
+    assert conn.rollbacks == 1
+
+
+def test_release_with_discard_closes():
+    pool, _ = make_pool()
+    conn = pool.acquire()
+    pool.release(conn, discard=True)
+    assert conn.closed
+    assert pool.stats()["size"] == 0
+
+
+def test_failed_rollback_discards():
+    pool, _ = make_pool()
+    conn = pool.acquire()
+    conn.rollback = lambda: (_ for _ in ()).throw(RuntimeError("gone"))
+    pool.release(conn)
+    assert conn.closed
+    assert pool.stats()["idle"] == 0
+
+
+def test_failed_ping_discards_and_opens_a_new_connection():
+    pool, opened = make_pool(ping_after=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.broken = True
+    fresh = pool.acquire()
+    assert fresh is not conn
+    assert conn.closed
+    assert conn.pings == 1
+    assert pool.stats()["failed_checks"] == 1
+    assert len(opened) == 2
+
+
+def test_no_ping_right_after_release():
+    pool, _ = make_pool(ping_after=30)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert conn.pings == 0
+
+
+def test_connection_past_max_age_is_replaced():
+    pool, opened = make_pool(max_age=0.05)
+    conn = pool.acquire()
+    pool.release(conn)
+    time.sleep(0.1)
+    fresh = pool.acquire()
+    assert fresh is not conn
+    assert conn.closed
+    assert len(opened) == 2
+
+
+def test_connection_past_max_age_is_closed_on_release():
+    pool, _ = make_pool(max_age=0.05)
+    conn = pool.acquire()
+    time.sleep(0.1)
+    pool.release(conn)
+    assert conn.closed
+    assert pool.stats()["idle"] == 0
+
+
+def test_exhausted_pool_waits_for_a_release():
+    pool, opened = make_pool(max_size=1)
+    conn = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire(timeout=5)))
+    waiter.start()
+    time.sleep(0.1)
+    assert not got
+    pool.release(conn)
+    waiter.join(5)
+    assert got == [conn]
+    assert len(opened) == 1
+    assert pool.stats()["waits"] == 1
+
+
+def test_exhausted_pool_times_out():
+    pool, _ = make_pool(max_size=1)
+    pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.acquire(timeout=0.1)
+    assert time.monotonic() - started >= 0.1
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_failed_factory_frees_its_slot():
+    def factory():
+        raise RuntimeError("no server")
+
+    pool = ConnectionPool(factory, min_size=0, max_size=1)
+    with pytest.raises(RuntimeError):
+        pool.acquire(timeout=0.1)
+    assert pool.stats()["size"] == 0
+
+
+def test_invalid_sizes():
+    with pytest.raises(ValueError):
+        ConnectionPool(FakeConnection, min_size=2, max_size=1)
@@ -0,0 +1,87 @@
+from persistence import Persistence
+
+
+def insert(table, row_id):
+    return ["i", table, {"id": row_id, "name": f"{table} {row_id}"}]
+
+
+def crash(store):
+    # what survives a kill: the synced lines, plus half of one that was being written
+    store._file.write('{"ops":[["i","orders",{"id"')
+    store._file.flush()
+
+
+def reopen(directory):
+    store = Persistence(directory, sync_interval=0)
+    state, transactions = store.recover()
+    return store, state, list(transactions)
+
+
+def test_wal_is_replayed_after_a_crash(tmp_path):
+    store = Persistence(str(tmp_path), sync_interval=0)
+    store.open()
+    store.commit([insert("orders", 1)], {"orders": 1})
+    store.commit([insert("orders", 2), ["u", "orders", 1, {"name": "renamed"}]], {"orders": 2})
+    crash(store)
+
+    _, state, transactions = reopen(str(tmp_path))
+    assert state is None
+    assert transactions == [
+        {"ops": [insert("orders", 1)], "versions": {"orders": 1}},
+        {"ops": [insert("orders", 2), ["u", "orders", 1, {"name": "renamed"}]], "versions": {"orders": 2}},
+    ]
+
+
+def test_reopened_log_starts_a_new_segment(tmp_path):
+    store = Persistence(str(tmp_path), sync_interval=0)
+    store.open()
+    store.commit([insert("orders", 1)], {"orders": 1})
+    crash(store)
+
+    store, _, _ = reopen(str(tmp_path))
+    store.open()
+    store.commit([insert("orders", 2)], {"orders": 2})
+    store.close()
+
+    _, _, transactions = reopen(str(tmp_path))
+    assert [t["versions"] for t in transactions] == [{"orders": 1}, {"orders": 2}]
+    assert store.segments() == [1, 2]
+
+
+def test_snapshot_is_restored_before_the_wal_tail(tmp_path):
+    store = Persistence(str(tmp_path), sync_interval=0)
+    store.open()
+    store.commit([insert("orders", 1)], {"orders": 1})
+    state = {"db": {"orders": {1: {"id": 1, "name": "orders 1"}}}, "counters": {"orders": 2}, "versions": {"orders": 1}}
+    store.snapshot(state)
+    assert store.records_since_snapshot == 0
+    store.commit([insert("orders", 2)], {"orders": 2})
+    crash(store)
+
+    _, restored, transactions = reopen(str(tmp_path))
+    assert restored["db"] == state["db"]
+    assert restored["counters"] == {"orders": 2}
+    # only what was logged after the snapshot
+    assert transactions == [{"ops": [insert("orders", 2)], "versions": {"orders": 2}}]
+
+
+def test_snapshot_drops_the_segments_it_covers(tmp_path):
+    store = Persistence(str(tmp_path), sync_interval=0)
+    store.open()
+    store.commit([insert("orders", 1)], {"orders": 1})
+    store.snapshot({"db": {}, "counters": {}, "versions": {}})
+    assert store.segments() == [2]
+    store.close()
+
+
+def test_commits_are_synced_in_batches(tmp_path):
+    store = Persistence(str(tmp_path), sync_interval=60)
+    store.open()
+    store.commit([insert("orders", 1)], {"orders": 1})
+    store.commit([insert("orders", 2)], {"orders": 2})
+    assert store.syncs == 0
+    store.sync()
+    assert store.syncs == 1
+    store.sync()
+    assert store.syncs == 1
+    store.close()
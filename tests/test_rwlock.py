@@ -0,0 +1,88 @@
+import threading
+import time
+
+from memory_server import RWLock
+
+
+def start(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_readers_share_the_lock():
+    lock = RWLock()
+    inside = threading.Barrier(3, timeout=5)
+
+    def reader():
+        with lock.read():
+            # only passes if all three readers hold the lock at once
+            inside.wait()
+
+    readers = [start(reader) for _ in range(3)]
+    for thread in readers:
+        thread.join(5)
+    assert not inside.broken
+    assert not any(thread.is_alive() for thread in readers)
+
+
+def test_writer_waits_for_readers():
+    lock = RWLock()
+    events = []
+    lock.acquire_read()
+    writer = start(lambda: (lock.acquire_write(), events.append("write"), lock.release_write()))
+    time.sleep(0.1)
+    assert events == []
+    events.append("read done")
+    lock.release_read()
+    writer.join(5)
+    assert events == ["read done", "write"]
+
+
+def test_writer_excludes_readers_and_writers():
+    lock = RWLock()
+    events = []
+    lock.acquire_write()
+    reader = start(lambda: (lock.acquire_read(), events.append("read"), lock.release_read()))
+    writer = start(lambda: (lock.acquire_write(), events.append("write"), lock.release_write()))
+    time.sleep(0.1)
+    assert events == []
+    lock.release_write()
+    reader.join(5)
+    writer.join(5)
+    assert sorted(events) == ["read", "write"]
+
+
+def test_waiting_writer_holds_off_new_readers():
+    lock = RWLock()
+    events = []
+    lock.acquire_read()
+    writer = start(lambda: (lock.acquire_write(), events.append("write"), lock.release_write()))
+    time.sleep(0.1)
+    reader = start(lambda: (lock.acquire_read(), events.append("read"), lock.release_read()))
+    time.sleep(0.1)
+    assert events == []
+    lock.release_read()
+    writer.join(5)
+    reader.join(5)
+    assert events == ["write", "read"]
+
+
+def test_writers_never_overlap():
+    lock = RWLock()
+    counter = {"value": 0, "inside": 0, "overlaps": 0}
+
+    def writer():
+        for _ in range(2000):
+            with lock.write():
+                counter["inside"] += 1
+                if counter["inside"] > 1:
+                    counter["overlaps"] += 1
+                counter["value"] += 1
+                counter["inside"] -= 1
+
+    writers = [start(writer) for _ in range(4)]
+    for thread in writers:
+        thread.join(30)
+    assert counter["value"] == 8000
+    assert counter["overlaps"] == 0
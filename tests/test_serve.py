@@ -0,0 +1,93 @@
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMULATOR = os.path.join(ROOT, "server_emulator_no_db", "memory_server.py")
+SHARED = ("TOKEN_STORE_PATH", "CACHE_INVALIDATION_DIR")
+
+
+def launcher_args(workers):
+    return argparse.Namespace(app=None, mode="threaded", workers=workers, threads=4, host="127.0.0.1", port=5078)
+
+
+@pytest.fixture
+def environ(monkeypatch, tmp_path):
+    # src/.env must not leak into the test process
+    monkeypatch.setattr(serve, "load_dotenv", lambda **kwargs: None)
+    for name in SHARED:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("API_RUNTIME_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_several_workers_share_tokens_and_invalidations(environ):
+    serve.settings(launcher_args(4))
+    assert os.environ["TOKEN_STORE_PATH"] == str(environ / "tokens.sqlite3")
+    assert os.environ["CACHE_INVALIDATION_DIR"] == str(environ / "invalidation")
+
+
+def test_configured_paths_are_kept(environ, monkeypatch):
+    monkeypatch.setenv("TOKEN_STORE_PATH", "/srv/eshop/tokens.sqlite3")
+    serve.settings(launcher_args(4))
+    assert os.environ["TOKEN_STORE_PATH"] == "/srv/eshop/tokens.sqlite3"
+    assert os.environ["CACHE_INVALIDATION_DIR"] == str(environ / "invalidation")
+
+
+def test_one_worker_keeps_everything_in_process(environ):
+    serve.settings(launcher_args(1))
+    assert not any(name in os.environ for name in SHARED)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def call(port, method, path):
+    # a new connection each time, so the requests spread over the workers
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request(method, path)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def test_token_issued_by_one_worker_is_revoked_by_another(tmp_path):
+    port = free_port()
+    env = {name: value for name, value in os.environ.items() if name not in SHARED}
+    env["API_RUNTIME_DIR"] = str(tmp_path)
+    launcher = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "src", "serve.py"), "--app", f"{EMULATOR}:app",
+         "--workers", "2", "--threads", "2", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                call(port, "GET", "/report/stock")
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+        # both workers have to be up before the requests can spread
+        time.sleep(2)
+        tokens = [json.loads(call(port, "GET", "/authorize?password=password")[1])["token"] for _ in range(20)]
+        assert [call(port, "DELETE", f"/logout?token={token}")[0] for token in tokens] == [200] * 20
+    finally:
+        launcher.terminate()
+        launcher.wait(60)
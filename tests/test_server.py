@@ -0,0 +1,174 @@
+import gzip
+import time
+
+import pytest
+
+# the API needs the ODBC driver manager even without a database
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+import server
+from connection_pool import ConnectionPool
+from table_gateway import OrdersGateway
+
+ORDER_COLUMNS = ("id",) + OrdersGateway.columns
+
+
+class FakeDatabase:
+    """The few statements the orders routes send, against an in-memory orders table."""
+
+    def __init__(self, orders: int):
+        self.orders = [self.order_row(i) for i in range(1, orders + 1)]
+        self.rowversion = len(self.orders)
+        self.version_reads = 0
+
+    @staticmethod
+    def order_row(order_id: int):
+        return (order_id, 7, 1, 1, None, f"{order_id}.00", "CZK", "{}", "{}", None, None)
+
+    def write(self, order_id: int = None):
+        self.orders.append(self.order_row(order_id or self.orders[-1][0] + 1))
+        self.rowversion += 1
+
+
+class FakeCursor:
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+        self.description = None
+        self.messages = []
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, sql, *params):
+        if "MAX(rv), COUNT_BIG(*) FROM orders" in sql:
+            self.db.version_reads += 1
+            self.description = [("rv",), ("count",)]
+            self._rows = [(self.db.rowversion.to_bytes(8, "big"), len(self.db.orders))]
+        elif sql.startswith("SELECT TOP (?)") and "FROM orders" in sql:
+            limit, after_id = params
+            self.description = [(c,) for c in ORDER_COLUMNS]
+            self._rows = [row for row in self.db.orders if row[0] > after_id][:limit]
+        elif "tg_order_create" in sql:
+            self.db.write()
+            self.rowcount = 1
+        else:
+            raise AssertionError(f"unexpected statement: {sql}")
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, n):
+        rows, self._rows = self._rows[:n], self._rows[n:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def nextset(self):
+        return False
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase(orders=25)
+    monkeypatch.setattr(server, "pool", ConnectionPool(lambda: FakeConnection(db), min_size=0))
+    for cache in (server.catalog_cache, server.version_cache, server.compressor.cache):
+        monkeypatch.setattr(cache, "_entries", type(cache._entries)())
+    return db
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+def test_matching_etag_gets_304(db, client):
+    first = client.get("/orders/all")
+    assert first.status_code == 200
+    again = client.get("/orders/all", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert again.data == b""
+
+
+def test_write_through_the_api_changes_the_etag(db, client):
+    etag = client.get("/orders/all").headers["ETag"]
+    created = client.post("/orders", json={
+        "user_id": 7, "shipping_address": {}, "billing_address": {}, "currency": "CZK",
+    })
+    assert created.status_code == 201
+    after = client.get("/orders/all", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != etag
+
+
+def test_write_outside_the_api_changes_the_etag_within_the_version_ttl(db, client, monkeypatch):
+    monkeypatch.setattr(server.version_cache, "ttl", 0.05)
+    etag = client.get("/orders/all").headers["ETag"]
+    # e.g. inventory_import.py or manual SQL: nothing is invalidated
+    db.write()
+    time.sleep(0.1)
+    after = client.get("/orders/all", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != etag
+
+
+def test_version_is_reused_within_its_ttl(db, client):
+    etag = client.get("/orders/all").headers["ETag"]
+    for _ in range(3):
+        assert client.get("/orders/all", headers={"If-None-Match": etag}).status_code == 304
+    assert db.version_reads == 1
+
+
+def test_etag_depends_on_the_page(db, client):
+    first = client.get("/orders/all?limit=10").headers["ETag"]
+    second = client.get("/orders/all?limit=10&after_id=10").headers["ETag"]
+    assert first != second
+
+
+def test_pages_walk_the_whole_table(db, client):
+    seen, after_id = [], 0
+    while after_id is not None:
+        page = client.get(f"/orders/all?limit=10&after_id={after_id}").get_json()
+        seen += [order["id"] for order in page["items"]]
+        after_id = page["next_cursor"]
+    assert seen == list(range(1, 26))
+
+
+def test_invalid_page_arguments_get_400(db, client):
+    assert client.get("/orders/all?limit=0").status_code == 400
+    assert client.get("/orders/all?after_id=x").status_code == 400
+
+
+def test_large_bodies_are_gzipped(db, client):
+    plain = client.get("/orders/all?limit=25")
+    compressed = client.get("/orders/all?limit=25", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert gzip.decompress(compressed.data) == plain.data
+
+
+def test_small_bodies_are_sent_as_they_are(db, client):
+    response = client.get("/orders/all?limit=1", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
@@ -0,0 +1,80 @@
+import sqlite3
+import time
+
+import pytest
+
+from token_store import MemoryTokenStore, SQLiteTokenStore, token_hash
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**options):
+        if request.param == "memory":
+            return MemoryTokenStore(**options)
+        return SQLiteTokenStore(str(tmp_path / "tokens.sqlite3"), **options)
+    return make
+
+
+def test_issued_token_is_valid(make_store):
+    store = make_store()
+    token = store.issue()
+    assert store.validate(token)
+    assert not store.validate("not a token")
+
+
+def test_token_expires(make_store):
+    store = make_store(ttl=0.05)
+    token = store.issue()
+    time.sleep(0.1)
+    assert not store.validate(token)
+    assert store.stats()["tokens"] == 0
+
+
+def test_revoke(make_store):
+    store = make_store()
+    token, other = store.issue(), store.issue()
+    assert store.revoke(token)
+    assert not store.validate(token)
+    assert not store.revoke(token)
+    assert store.validate(other)
+
+
+def test_purge_drops_expired_tokens(make_store):
+    store = make_store(ttl=60)
+    store.issue()
+    store.issue()
+    assert store.purge(time.time() + 120) == 2
+    assert store.stats()["tokens"] == 0
+
+
+def test_oldest_tokens_are_revoked_beyond_max_tokens(make_store):
+    store = make_store(max_tokens=3)
+    tokens = [store.issue() for _ in range(5)]
+    # the SQLite store enforces the cap in its sweep
+    store.purge()
+    assert [store.validate(t) for t in tokens] == [False, False, True, True, True]
+
+
+def test_memory_store_keeps_only_hashes():
+    store = MemoryTokenStore()
+    token = store.issue()
+    assert list(store._tokens) == [token_hash(token)]
+
+
+def test_sqlite_store_keeps_only_hashes(tmp_path):
+    path = str(tmp_path / "tokens.sqlite3")
+    token = SQLiteTokenStore(path).issue()
+    rows = sqlite3.connect(path).execute("SELECT digest FROM tokens").fetchall()
+    assert rows == [(token_hash(token),)]
+    # the database file and its WAL
+    for written in tmp_path.iterdir():
+        assert token.encode() not in written.read_bytes()
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "tokens.sqlite3")
+    token = SQLiteTokenStore(path).issue()
+    other_worker = SQLiteTokenStore(path)
+    assert other_worker.validate(token)
+    assert other_worker.revoke(token)
+    assert not SQLiteTokenStore(path).validate(token)
@@ -3,6 +3,9 @@ const API = {
     baseUrl: '',
     token: null,
     
+    // GET bodies by URL, reused when the server answers 304 Not Modified
+    etagCache: new Map(),
+    
     // Initialize API connection
     init(host, port, password) {
         this.baseUrl = `http://${host}:${port}`;
@@ -37,6 +40,7 @@ const API = {
             }
             this.token = null;
             this.baseUrl = '';
+            this.etagCache.clear();
         }
     },
     
@@ -53,8 +57,18 @@ const API = {
             options.body = JSON.stringify(data);
         }
         
+        const url = `${this.baseUrl}${endpoint}`;
+        const cached = method === 'GET' ? this.etagCache.get(url) : null;
+        if (cached) {
+            options.headers['If-None-Match'] = cached.etag;
+        }
+        
         try {
-            const response = await fetch(`${this.baseUrl}${endpoint}`, options);
+            const response = await fetch(url, options);
+            
+            if (response.status === 304 && cached) {
+                return JSON.parse(cached.body);
+            }
             
             if (!response.ok) {
                 const errorText = await response.text();
@@ -63,6 +77,10 @@ const API = {
             
             // Handle empty responses
             const text = await response.text();
+            const etag = response.headers.get('ETag');
+            if (method === 'GET' && etag && text) {
+                this.etagCache.set(url, { etag, body: text });
+            }
             return text ? JSON.parse(text) : {};
         } catch (error) {
             console.error('API request error:', error);
@@ -70,10 +88,22 @@ const API = {
         }
     },
     
+    // Follow next_cursor until every page of a paginated list is loaded
+    async requestAll(endpoint, pageSize = 1000) {
+        let items = [];
+        let cursor = 0;
+        while (cursor !== null && cursor !== undefined) {
+            const page = await this.request(`${endpoint}?after_id=${cursor}&limit=${pageSize}`);
+            items = items.concat(page.items);
+            cursor = page.next_cursor;
+        }
+        return items;
+    },
+    
     // Orders API
     orders: {
         getAll() {
-            return API.request('/orders/all');
+            return API.requestAll('/orders/all');
         },
         
         getById(id) {
@@ -94,7 +124,7 @@ const API = {
         
         // Order items
         getItems(orderId) {
-            return API.request(`/orders/${orderId}/items`);
+            return API.requestAll(`/orders/${orderId}/items`);
         },
         
         addItem(orderId, productId, quantity) {
@@ -104,6 +134,10 @@ const API = {
             });
         },
         
+        addItems(orderId, items) {
+            return API.request(`/orders/${orderId}/items/bulk`, 'POST', items);
+        },
+        
         removeItem(orderId, productName) {
             return API.request(`/orders/${orderId}/items`, 'DELETE', {
                 name: productName
@@ -114,7 +148,7 @@ const API = {
     // Products API
     products: {
         getAll() {
-            return API.request('/products/all');
+            return API.requestAll('/products/all');
         },
         
         getById(id) {
@@ -137,7 +171,7 @@ const API = {
     // Warehouses API
     warehouses: {
         getAll() {
-            return API.request('/warehouses/all');
+            return API.requestAll('/warehouses/all');
         },
         
         getById(id) {
@@ -160,15 +194,15 @@ const API = {
     // Inventory API
     inventory: {
         getAll() {
-            return API.request('/inventory/all');
+            return API.requestAll('/inventory/all');
         },
         
         getByWarehouse(warehouseId) {
-            return API.request(`/inventory/warehouse/${warehouseId}`);
+            return API.requestAll(`/inventory/warehouse/${warehouseId}`);
         },
         
         getByProduct(productId) {
-            return API.request(`/inventory/product/${productId}`);
+            return API.requestAll(`/inventory/product/${productId}`);
         },
         
         getById(id) {
@@ -197,8 +231,11 @@ const API = {
     
     // Reports API
     reports: {
-        getSales() {
-            return API.request('/report/sales');
+        // params: filters (date_from, date_to, order_status, payment_status,
+        // warehouse_id, currency) and group_by, aggregated by the server
+        getSales(params = null) {
+            const query = params ? `?${new URLSearchParams(params)}` : '';
+            return API.request(`/report/sales${query}`);
         },
         
         getStock() {
@@ -15,12 +15,15 @@ const Reports = {
             
             if (reportType === 'sales') {
                 titleElement.textContent = 'Sales Report';
-                const data = await API.reports.getSales();
-                console.log('Sales report data:', data);
-                console.log('First item:', data && data.length > 0 ? data[0] : 'No data');
-                this.currentReportData = data;
+                // only the aggregates are downloaded, the server computes them
+                const [totals, byMonth, byWarehouse] = await Promise.all([
+                    API.reports.getSales({ group_by: 'all' }),
+                    API.reports.getSales({ group_by: 'month' }),
+                    API.reports.getSales({ group_by: 'warehouse' })
+                ]);
+                this.currentReportData = byMonth;
                 this.currentReportType = 'sales';
-                this.renderSalesReport(data, contentElement);
+                this.renderSalesReport({ totals: totals[0], byMonth, byWarehouse }, contentElement);
                 document.getElementById('salesReportUpdate').textContent = new Date().toLocaleString();
             } else if (reportType === 'stock') {
                 titleElement.textContent = 'Stock Report';
@@ -114,49 +117,43 @@ const Reports = {
         URL.revokeObjectURL(url);
     },
     
-    // Render sales report
+    // Render sales report from server-side aggregates
     renderSalesReport(data, container) {
-        if (!data || data.length === 0) {
+        const totals = data.totals || {};
+        if (!totals.order_count) {
             container.innerHTML = '<p style="text-align: center; padding: 40px;">No sales data available</p>';
             return;
         }
         
-        // Debug: log the first item to see what fields we have
-        console.log('Sales report data sample:', data[0]);
-        
-        // Calculate summary statistics - handle different possible field names
-        const totalOrders = new Set(data.map(item => item.order_id || item.id_order)).size;
-        const totalRevenue = data.reduce((sum, item) => {
-            const total = parseFloat(item.total_amount || item.item_total || item.total || 0);
-            return sum + total;
-        }, 0);
+        const totalOrders = totals.order_count;
+        const totalRevenue = parseFloat(totals.total_amount) || 0;
         const avgOrderValue = totalOrders > 0 ? totalRevenue / totalOrders : 0;
         
-        // Group by product - handle various field name possibilities
-        const productSales = {};
-        data.forEach(item => {
-            const productName = item.product_name || item.name || item.productName;
-            if (!productName || productName === 'undefined') return; // Skip if no product name
-            
-            if (!productSales[productName]) {
-                productSales[productName] = {
-                    quantity: 0,
-                    revenue: 0
-                };
-            }
-            const qty = parseInt(item.quantity || item.qty || 0);
-            const itemTotal = parseFloat(item.item_total || item.total || item.total_amount || 0);
-            
-            productSales[productName].quantity += isNaN(qty) ? 0 : qty;
-            productSales[productName].revenue += isNaN(itemTotal) ? 0 : itemTotal;
-        });
-        
-        // Convert to array and sort by revenue
-        const topProducts = Object.entries(productSales)
-            .map(([name, stats]) => ({ name, ...stats }))
-            .filter(p => p.name && p.name !== 'undefined') // Filter out undefined names
-            .sort((a, b) => b.revenue - a.revenue)
-            .slice(0, 10);
+        const groupTable = (title, label, rows, labelOf) => `
+            <div class="report-table">
+                <h3>${title}</h3>
+                <table class="data-table">
+                    <thead>
+                        <tr>
+                            <th>${label}</th>
+                            <th>Orders</th>
+                            <th>Items</th>
+                            <th>Revenue</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        ${rows.map(row => `
+                            <tr>
+                                <td>${labelOf(row)}</td>
+                                <td>${row.order_count}</td>
+                                <td>${row.total_items || 0}</td>
+                                <td>${UI.formatCurrency(parseFloat(row.total_amount) || 0)}</td>
+                            </tr>
+                        `).join('')}
+                    </tbody>
+                </table>
+            </div>
+        `;
         
         container.innerHTML = `
             <div class="report-grid">
@@ -177,66 +174,8 @@ const Reports = {
                 </div>
             </div>
             
-            ${topProducts.length > 0 ? `
-            <div class="report-table">
-                <h3>Top Selling Products</h3>
-                <table class="data-table">
-                    <thead>
-                        <tr>
-                            <th>Product Name</th>
-                            <th>Quantity Sold</th>
-                            <th>Revenue</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        ${topProducts.map(product => `
-                            <tr>
-                                <td>${product.name}</td>
-                                <td>${product.quantity}</td>
-                                <td>${UI.formatCurrency(product.revenue)}</td>
-                            </tr>
-                        `).join('')}
-                    </tbody>
-                </table>
-            </div>
-            ` : '<p style="text-align: center; padding: 20px;">No product sales data available</p>'}
-            
-            <div class="report-table">
-                <h3>All Sales Details</h3>
-                <table class="data-table">
-                    <thead>
-                        <tr>
-                            <th>Order ID</th>
-                            <th>Product</th>
-                            <th>Quantity</th>
-                            <th>Unit Price</th>
-                            <th>Total</th>
-                            <th>Date</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        ${data.map(item => {
-                            const orderId = item.order_id || item.id_order || '-';
-                            const productName = item.product_name || item.name || item.productName || 'Unknown';
-                            const quantity = item.quantity || item.qty || 0;
-                            const unitPrice = parseFloat(item.unit_price || item.price || 0);
-                            const total = parseFloat(item.item_total || item.total || 0);
-                            const date = item.order_date || item.created_at || item.date || null;
-                            
-                            return `
-                                <tr>
-                                    <td>${orderId}</td>
-                                    <td>${productName}</td>
-                                    <td>${quantity}</td>
-                                    <td>${isNaN(unitPrice) ? '-' : UI.formatCurrency(unitPrice)}</td>
-                                    <td>${isNaN(total) ? '-' : UI.formatCurrency(total)}</td>
-                                    <td>${UI.formatDate(date)}</td>
-                                </tr>
-                            `;
-                        }).join('')}
-                    </tbody>
-                </table>
-            </div>
+            ${groupTable('Sales by Month', 'Month', data.byMonth, row => row.month)}
+            ${groupTable('Sales by Warehouse', 'Warehouse', data.byWarehouse, row => row.warehouse_name)}
         `;
     },
     